@@ -0,0 +1,84 @@
+# Benchmark: vectorized enhance_dataset against the row-wise apply version
+#
+#   python benchmarks/bench_enhance.py --rows 1000000
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import data_enhancements as de
+
+WORDS = ('python sql excel remote hybrid flexible full time part time contract intern startup '
+         'global medical housing transport training bonus vacation arabic english french '
+         'engineer team client project manage support develop design report data the and').split()
+LEVELS = ['Entry level', 'Mid-Senior level', 'Associate', 'Director', 'Executive', 'Internship', None]
+REGIONS = ['Riyadh', 'Makkah', 'Eastern', 'Remote', 'Asir', 'NotDefind']
+
+
+def synthetic_frame(rows, seed=0):
+    """A processed-looking frame with the columns enhance_dataset reads"""
+    rng = np.random.default_rng(seed)
+
+    # A pool of descriptions reused across rows keeps generation fast
+    pool = [' '.join(rng.choice(WORDS, size=rng.integers(10, 120))) for _ in range(5000)]
+    descriptions = np.array(pool, dtype=object)[rng.integers(0, len(pool), rows)]
+    descriptions[rng.random(rows) < 0.01] = np.nan
+
+    return pd.DataFrame({
+        'description': descriptions,
+        'level': np.array(LEVELS, dtype=object)[rng.integers(0, len(LEVELS), rows)],
+        'Regions': np.array(REGIONS, dtype=object)[rng.integers(0, len(REGIONS), rows)],
+        'year_of_ex': rng.integers(0, 10, rows),
+        'salary_mentioned': np.where(rng.random(rows) < 0.05, '10000 sar', None),
+        'skills': np.where(rng.random(rows) < 0.3, 'python, sql', None),
+        'description_length': rng.integers(50, 2000, rows),
+    })
+
+
+def enhance_dataset_rowwise(df):
+    """The original implementation: Series.apply and DataFrame.apply(axis=1)"""
+    df['job_type'] = df['description'].apply(de.extract_job_type)
+    df['company_size'] = df['description'].apply(de.extract_company_size)
+    df['benefits'] = df['description'].apply(de.extract_benefits)
+    df['seniority_level'] = df.apply(lambda x: de.categorize_seniority(x['level'], x.get('year_of_ex', 0)), axis=1)
+    df['work_model'] = df.apply(lambda x: de.extract_work_model(x['description'], x['Regions']), axis=1)
+    df['language_requirements'] = df['description'].apply(de.extract_language_requirements)
+    df['job_attractiveness_score'] = df.apply(de.calculate_job_attractiveness_score, axis=1)
+    return df
+
+
+def timed(func, df):
+    start = time.perf_counter()
+    result = func(df.copy())
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the vectorized enhance_dataset')
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--skip-rowwise', action='store_true', help='only time the vectorized version')
+    args = parser.parse_args()
+
+    df = synthetic_frame(args.rows)
+    print(f'{args.rows:,} synthetic rows')
+
+    vectorized, vectorized_time = timed(de.enhance_dataset, df)
+    print(f'vectorized enhance_dataset: {vectorized_time:.2f}s')
+    if args.skip_rowwise:
+        return
+
+    rowwise, rowwise_time = timed(enhance_dataset_rowwise, df)
+    print(f'row-wise enhance_dataset:   {rowwise_time:.2f}s')
+    print(f'speedup: {rowwise_time / vectorized_time:.1f}x')
+
+    pd.testing.assert_frame_equal(rowwise, vectorized, check_dtype=False)
+    print('outputs are identical')
+
+
+if __name__ == '__main__':
+    main()
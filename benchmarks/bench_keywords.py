@@ -0,0 +1,103 @@
+# Benchmark: one keyword scan per description against a substring test per keyword
+#
+#   python benchmarks/bench_keywords.py --rows 2600 --keywords 13,3000
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import keywords
+from extraction import KEYWORD_FIELD_GROUPS, extract_keyword_fields
+from rules import FIRST_MATCH_GROUPS, KeywordMatcher, build_automaton
+from synthetic import synthetic_postings
+
+# The extractors the keyword scan replaced: a substring test per keyword
+SKILLS = ['python', 'java', 'sql', 'excel', 'powerbi', 'tableau', 'aws', 'azure', 'docker', 'react', 'nodejs',
+          'machine learning', 'data analysis']
+JOB_TYPES = [('Full-time', ['full time', 'full-time', 'permanent']), ('Part-time', ['part time', 'part-time']),
+             ('Contract', ['contract', 'contractor', 'freelance']), ('Internship', ['intern', 'internship', 'trainee'])]
+COMPANY_SIZES = [('Small', ['startup', 'small company', 'growing team']),
+                 ('Medium', ['medium', 'established', '100+ employees']),
+                 ('Large', ['large', 'multinational', 'global', 'fortune', '1000+ employees'])]
+
+
+def baseline_fields(description):
+    """Skills, job type and company size as the original three extractors found them"""
+    skills = [skill for skill in SKILLS if skill in description]
+    job_type = next((label for label, words in JOB_TYPES if any(w in description for w in words)), 'Not Specified')
+    size = next((label for label, words in COMPANY_SIZES if any(w in description for w in words)), 'Unknown')
+    return ', '.join(skills) if skills else np.nan, job_type, size
+
+
+def backends():
+    """The KeywordMatcher backends available here"""
+    available = []
+    for backend in KeywordMatcher.BACKENDS:
+        try:
+            KeywordMatcher([('a', 0)], backend)
+        except ImportError:
+            continue
+        available.append(backend)
+    return available
+
+
+def per_row(func, texts):
+    """Microseconds per text of func"""
+    start = time.perf_counter()
+    for text in texts:
+        func(text)
+    return (time.perf_counter() - start) / len(texts) * 1e6
+
+
+def vocabulary(texts, size, seed=0):
+    """size keywords: the skills, then words and word pairs of the texts, then strings found in none"""
+    rng = np.random.default_rng(seed)
+    words = sorted({word for text in texts[:200] for word in text.split() if len(word) > 2})
+    pairs = sorted({' '.join(pair) for text in texts[:200] for pair in zip(text.split(), text.split()[1:])})
+    found = list(dict.fromkeys(SKILLS + list(rng.permutation(words)) + list(rng.permutation(pairs))))[:size]
+    letters = np.array(list('abcdefghijklmnopqrstuvwxyz'))
+    while len(found) < size:
+        found.append(''.join(rng.choice(letters, size=rng.integers(5, 12))) + 'q')
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the keyword scan of the extractors')
+    parser.add_argument('--rows', type=int, default=2600, help='distinct descriptions scanned')
+    parser.add_argument('--keywords', default='13,3000', help='comma-separated vocabulary sizes')
+    args = parser.parse_args()
+
+    texts = synthetic_postings(args.rows * 2, seed=1)['description'].drop_duplicates().str.lower().tolist()
+    texts = texts[:args.rows]
+    print(f'{len(texts):,} descriptions, {sum(map(len, texts)) / len(texts):,.0f} characters on average')
+
+    print('\n=== EXTRACTORS (current vocabulary) ===')
+    print(f'substring tests per keyword: {per_row(baseline_fields, texts):8.1f} us/row')
+    groups = {group: keywords.keyword_groups[group] for group in KEYWORD_FIELD_GROUPS}
+    current = keywords._matchers.get(KEYWORD_FIELD_GROUPS)
+    try:
+        for backend in backends():
+            keywords._matchers[KEYWORD_FIELD_GROUPS] = build_automaton(groups, backend, FIRST_MATCH_GROUPS)
+            print(f'one scan ({backend}):{" " * (15 - len(backend))}{per_row(extract_keyword_fields, texts):8.1f} us/row')
+    finally:
+        keywords._matchers.pop(KEYWORD_FIELD_GROUPS)
+        if current is not None:
+            keywords._matchers[KEYWORD_FIELD_GROUPS] = current
+
+    for size in [int(size) for size in args.keywords.split(',')]:
+        terms = vocabulary(texts, size)
+        print(f'\n=== {size:,} KEYWORDS ===')
+        reference = [{term for term in terms if term in text} for text in texts]
+        print(f'substring tests per keyword: {per_row(lambda text: [t for t in terms if t in text], texts):8.1f} us/row')
+        for backend in backends():
+            matcher = KeywordMatcher([(term, term) for term in terms], backend)
+            assert [matcher.find(text) for text in texts] == reference, backend
+            print(f'one scan ({backend}):{" " * (15 - len(backend))}{per_row(matcher.find, texts):8.1f} us/row')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+# Benchmark: cold start of the pipeline modules, from interpreter launch to the first processed record
+#
+#   python benchmarks/bench_startup.py --repeat 10 --output startup.json
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from synthetic import synthetic_postings
+
+# (name, import, first record); the record is a raw synthetic posting. process_chunk gets it
+# twice, as the corrupt-row filter needs a standard deviation of the word counts
+SCENARIOS = [
+    ('interpreter', '', ''),
+    ('extraction', 'import extraction',
+     "extraction.extract_fields(record['description'])"),
+    ('data_enhancements', 'import data_enhancements as de',
+     "de.extract_job_type(record['description']); de.categorize_seniority(record['level'], 3)"),
+    ('text_processing', 'import text_processing as tp',
+     "import pandas as pd; tp.process_chunk(pd.DataFrame([record] * 2).astype({'date': 'datetime64[ns]'}))"),
+]
+
+# Run in a fresh interpreter per measurement; the record is read before the clock starts
+CHILD = '''
+import contextlib, io, json, sys, time
+sys.path.insert(0, {root!r})
+record = json.loads(sys.stdin.read())
+start = time.perf_counter()
+{import_code}
+imported = time.perf_counter()
+with contextlib.redirect_stdout(io.StringIO()):
+    {first_code}
+done = time.perf_counter()
+print(json.dumps({{'import_ms': (imported - start) * 1000, 'first_ms': (done - imported) * 1000,
+                  'modules': len(sys.modules), 'pandas': 'pandas' in sys.modules,
+                  'matplotlib': 'matplotlib' in sys.modules}}))
+'''
+
+
+def run_scenario(import_code, first_code, record):
+    """One cold start in a child interpreter: wall time of the process and its own timings"""
+    code = CHILD.format(root=ROOT, import_code=import_code or 'pass', first_code=first_code or 'pass')
+    start = time.perf_counter()
+    child = subprocess.run([sys.executable, '-c', code], input=record, capture_output=True, text=True)
+    wall_ms = (time.perf_counter() - start) * 1000
+    if child.returncode:
+        raise RuntimeError(f'{import_code} failed:\n{child.stderr}')
+    return dict(json.loads(child.stdout.strip().splitlines()[-1]), wall_ms=wall_ms)
+
+
+def benchmark_startup(repeat=5, seed=0):
+    """Median timings of every scenario over repeat cold starts"""
+    record = synthetic_postings(1, seed).iloc[0].to_json(date_format='iso')
+    results = []
+    print(f"{'scenario':<20} {'process':>10} {'import':>10} {'first record':>13} {'modules':>8}  pandas")
+    for name, import_code, first_code in SCENARIOS:
+        runs = [run_scenario(import_code, first_code, record) for _ in range(repeat)]
+        result = {'scenario': name}
+        for key in ('wall_ms', 'import_ms', 'first_ms'):
+            result[key] = round(statistics.median(run[key] for run in runs), 1)
+        result.update({key: runs[-1][key] for key in ('modules', 'pandas', 'matplotlib')})
+        results.append(result)
+        print(f"{name:<20} {result['wall_ms']:8.1f}ms {result['import_ms']:8.1f}ms {result['first_ms']:11.1f}ms "
+              f"{result['modules']:>8}  {'yes' if result['pandas'] else 'no'}")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Time importing the pipeline modules and processing one record')
+    parser.add_argument('--repeat', type=int, default=5, help='cold starts per scenario (the median is kept)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='write the results as JSON to this file')
+    args = parser.parse_args()
+
+    results = benchmark_startup(args.repeat, args.seed)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'python': sys.version.split()[0], 'repeat': args.repeat, 'results': results}, f, indent=2)
+        print(f"\nResults saved to '{args.output}'")
+
+
+if __name__ == '__main__':
+    main()
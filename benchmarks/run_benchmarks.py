@@ -0,0 +1,176 @@
+# Per-stage benchmarks of text_processing.py and data_enhancements.enhance_dataset
+#
+#   python benchmarks/run_benchmarks.py --sizes 10k,100k,1M,10M --output results.json
+#   python benchmarks/run_benchmarks.py --sizes 10k,100k --baseline results.json
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import data_enhancements as de
+from memo import memo_cache
+from storage import write_table
+from synthetic import parse_rows, synthetic_postings
+from text_processing import build_pipeline
+
+# A stage counts as regressed when it is this much slower (or bigger) than the baseline...
+DEFAULT_TOLERANCE = 0.2
+# ...and the difference is above the noise floor
+MIN_SECONDS = 0.05
+MIN_MB = 5.0
+
+
+def benchmark_stages(output_path, workers=1):
+    """(name, func) for every stage of the pipeline, then enhance_dataset"""
+    pipeline = build_pipeline(output_path, cache_dir=None, workers=workers, verbose=False)
+    stages = [(stage.name, stage.run) for stage in pipeline.stages]
+    stages.append(('enhance', de.enhance_dataset))
+    return stages
+
+
+def row_count(data):
+    return len(data) if isinstance(data, pd.DataFrame) else None
+
+
+def run_stage(func, data):
+    """Run one stage on a fresh copy of its input with an empty memo cache, output silenced"""
+    memo_cache.clear()
+    data = data.copy() if isinstance(data, pd.DataFrame) else data
+    with contextlib.redirect_stdout(io.StringIO()):
+        start, cpu_start = time.perf_counter(), time.process_time()
+        result = func(data)
+        return result, time.perf_counter() - start, time.process_time() - cpu_start
+
+
+def peak_memory(func, data):
+    """Peak Python allocations of one stage run, in MB"""
+    memo_cache.clear()
+    data = data.copy() if isinstance(data, pd.DataFrame) else data
+    tracemalloc.start()
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            func(data)
+        return tracemalloc.get_traced_memory()[1] / 2 ** 20
+    finally:
+        tracemalloc.stop()
+
+
+def benchmark_size(rows, seed=0, unique=0.8, repeat=1, memory=True, workers=1):
+    """Time (best of repeat) and memory-profile every stage on rows synthetic postings"""
+    results = []
+    with tempfile.TemporaryDirectory(prefix='benchmarks_') as tmp:
+        source = os.path.join(tmp, 'postings.parquet')
+        write_table(synthetic_postings(rows, seed, unique), source)
+
+        data = source
+        for name, func in benchmark_stages(os.path.join(tmp, 'data_jobs.parquet'), workers):
+            timings = [run_stage(func, data) for _ in range(repeat)]
+            output = timings[-1][0]
+            seconds = min(timing[1] for timing in timings)
+            cpu_seconds = min(timing[2] for timing in timings)
+
+            result = {
+                'rows': rows,
+                'stage': name,
+                'seconds': round(seconds, 4),
+                'cpu_seconds': round(cpu_seconds, 4),
+                'peak_mb': round(peak_memory(func, data), 1) if memory else None,
+                'rows_in': row_count(data),
+                'rows_out': row_count(output),
+            }
+            results.append(result)
+            print(f"{rows:>12,} {name:<12} {seconds:9.3f}s"
+                  + (f" {result['peak_mb']:9.1f} MB" if memory else '')
+                  + f"  rows {result['rows_in'] or '-'} -> {result['rows_out']}")
+            data = output
+    return results
+
+
+def environment():
+    return {
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'processor': platform.processor() or platform.machine(),
+        'cpu_count': os.cpu_count(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+    }
+
+
+def compare(results, baseline, tolerance=DEFAULT_TOLERANCE):
+    """Per-stage ratios against a baseline run; returns the regressions found"""
+    previous = {(result['rows'], result['stage']): result for result in baseline['results']}
+    regressions = []
+
+    print(f"\n{'rows':>12} {'stage':<12} {'time':>9} {'baseline':>9} {'ratio':>7}   memory ratio")
+    for result in results:
+        before = previous.get((result['rows'], result['stage']))
+        if before is None:
+            continue
+        ratio = result['seconds'] / before['seconds'] if before['seconds'] else float('inf')
+        slower = ratio > 1 + tolerance and result['seconds'] - before['seconds'] > MIN_SECONDS
+
+        memory_ratio, bigger = None, False
+        if result['peak_mb'] is not None and before.get('peak_mb'):
+            memory_ratio = result['peak_mb'] / before['peak_mb']
+            bigger = memory_ratio > 1 + tolerance and result['peak_mb'] - before['peak_mb'] > MIN_MB
+
+        flag = '  REGRESSION' if slower or bigger else ''
+        print(f"{result['rows']:>12,} {result['stage']:<12} {result['seconds']:8.3f}s {before['seconds']:8.3f}s "
+              f"{ratio:6.2f}x   {'-' if memory_ratio is None else f'{memory_ratio:.2f}x'}{flag}")
+        if flag:
+            regressions.append(result)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark every stage of the processing pipeline')
+    parser.add_argument('--sizes', default='10k,100k', help='comma-separated row counts, e.g. 10k,100k,1M,10M')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--unique', type=float, default=0.8, help='share of distinct descriptions')
+    parser.add_argument('--repeat', type=int, default=1, help='keep the best time of this many runs per stage')
+    parser.add_argument('--no-memory', action='store_true', help='skip the tracemalloc pass (halves the run time)')
+    parser.add_argument('--workers', type=int, default=1, help='processes used by the extractors')
+    parser.add_argument('--output', help='write the results as JSON to this file')
+    parser.add_argument('--baseline', help='JSON results of an earlier run to compare against')
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help='allowed slowdown or memory growth per stage (0.2 = 20%%)')
+    args = parser.parse_args()
+
+    results = []
+    for size in args.sizes.split(','):
+        results += benchmark_size(parse_rows(size), args.seed, args.unique, args.repeat,
+                                  not args.no_memory, args.workers)
+
+    report = {'environment': environment(),
+              'settings': {'seed': args.seed, 'unique': args.unique, 'repeat': args.repeat, 'workers': args.workers},
+              'results': results}
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nResults saved to '{args.output}'")
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f'\n{len(regressions)} stage(s) regressed against {args.baseline}')
+            sys.exit(1)
+        print(f'\nNo regressions against {args.baseline}')
+
+
+if __name__ == '__main__':
+    main()
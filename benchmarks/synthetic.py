@@ -0,0 +1,150 @@
+# Reproducible synthetic LinkedIn postings shaped like the Saudi Arabia 2020 dataset
+#
+#   python benchmarks/synthetic.py --rows 1000000 --output postings_1m.parquet
+import argparse
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from regions import load_region_rules
+
+# Share of postings per city, roughly as in the README's region breakdown
+CITY_WEIGHTS = {'Riyadh': 0.51, 'Jeddah': 0.08, 'Makkah': 0.03, 'Dammam': 0.04, 'AlKhobar': 0.03,
+                'Dhahran': 0.015, 'Jubail': 0.01, 'Madinah': 0.015, 'Abha': 0.005, 'Tabuk': 0.005}
+LOCATION_FORMATS = ['{city}, Saudi Arabia', '{city}, {region}, Saudi Arabia', '{city}', 'Greater {city} Area']
+
+# LinkedIn's industry names
+INDUSTRIES = ['Information Technology and Services', 'Construction', 'Marketing and Advertising', 'Computer Software',
+              'Oil & Energy', 'Banking, Financial Services', 'Hospital & Health Care', 'Staffing and Recruiting',
+              'Telecommunications', 'Real Estate', 'Education Management', 'Retail', 'Management Consulting',
+              'Food & Beverages', 'Civil Engineering', 'Logistics and Supply Chain', 'Government Administration',
+              'Human Resources', 'Hospitality', 'Automotive']
+INDUSTRY_WEIGHTS = np.array([0.15, 0.09] + [0.04] * 18)
+
+LEVELS = ['Entry level', 'Associate', 'Mid-Senior level', 'Director', 'Executive', 'Internship', 'Not Applicable']
+LEVEL_WEIGHTS = [0.22, 0.12, 0.38, 0.06, 0.04, 0.03, 0.15]
+
+# Sentence parts; the keyword-bearing ones feed the extractors
+OPENINGS = ['We are hiring a {role} to join our team in {city}.', 'Our client, a {size} company, is looking for a {role}.',
+            'Job description: {role} ({type}).', 'An exciting opportunity for a {role} has opened.']
+REQUIREMENTS = ['{years}+ years of experience in {skill} and {skill2}.', '{low} to {high} years experience as a {role}.',
+                "{degree} degree in engineering or a related field.", 'Strong knowledge of {skill}, {skill2} and {skill3}.',
+                'Fluent {language} is required; {language2} is a plus.', 'Experience with {skill} is preferred.',
+                'Salary: {salary} SAR per month.', 'Entry level candidates and fresh graduates are welcome.']
+BENEFITS = ['We offer medical insurance, housing and transportation allowances.', 'Annual bonus and paid vacation.',
+            'This is a {model} role with flexible hours.', 'Training and career development programs.']
+FILLER = ['You will work closely with clients and internal teams to deliver projects on time.',
+          'Responsibilities include preparing reports, analysing data and supporting management decisions.',
+          'The candidate will manage daily operations and ensure quality standards are met.',
+          'Please share your resume via email; only shortlisted candidates will be contacted.',
+          'Excellent communication, problem solving and time management skills.',
+          'Ability to work under pressure in a fast paced environment.',
+          'Coordinate with suppliers, contractors and other departments as required.']
+ROLES = ['data analyst', 'software engineer', 'accountant', 'sales executive', 'project manager', 'civil engineer',
+         'nurse', 'hr specialist', 'marketing coordinator', 'site supervisor', 'customer service agent']
+SKILLS = ['python', 'java', 'sql', 'excel', 'powerbi', 'tableau', 'aws', 'azure', 'docker', 'react', 'nodejs',
+          'machine learning', 'data analysis', 'sap', 'autocad', 'accounting', 'negotiation']
+DEGREES = ["Bachelor's", "Master's", 'PhD', 'Diploma', 'University', 'College']
+JOB_TYPES = ['full-time', 'part-time', 'contract', 'internship', 'permanent', 'temporary']
+SIZES = ['startup', 'small', 'medium', 'large', 'multinational', 'fortune 500', 'established']
+LANGUAGES = ['English', 'Arabic', 'French', 'German']
+MODELS = ['remote', 'hybrid', 'work from home', 'on-site']
+
+
+def _sentence_pool(rng, size):
+    """Filled-in sentences the descriptions are assembled from"""
+    templates = OPENINGS + REQUIREMENTS * 2 + BENEFITS + FILLER * 3
+    pool = []
+    for template in rng.choice(templates, size=size):
+        low = int(rng.integers(1, 8))
+        pool.append(template.format(
+            role=rng.choice(ROLES), city=rng.choice(list(CITY_WEIGHTS)), size=rng.choice(SIZES),
+            type=rng.choice(JOB_TYPES), years=low, low=low, high=low + int(rng.integers(1, 5)),
+            skill=rng.choice(SKILLS), skill2=rng.choice(SKILLS), skill3=rng.choice(SKILLS),
+            degree=rng.choice(DEGREES), language=rng.choice(LANGUAGES), language2=rng.choice(LANGUAGES),
+            salary=f'{int(rng.integers(4, 40)) * 1000:,}', model=rng.choice(MODELS)))
+    return np.array(pool, dtype=object)
+
+
+def _descriptions(rng, count):
+    """Descriptions of a realistic length: a few words up to ~1,500, most between 100 and 250"""
+    pool = _sentence_pool(rng, 4000)
+    sentences = np.clip(rng.lognormal(mean=2.9, sigma=0.6, size=count).astype(int), 1, 150)
+
+    # A few posts are one short line, which the corrupt-row filter drops
+    sentences[rng.random(count) < 0.03] = 1
+    picks = rng.integers(0, len(pool), size=sentences.sum())
+    ends = np.cumsum(sentences)
+    starts = ends - sentences
+    return np.array([' '.join(pool[picks[start:end]]) for start, end in zip(starts, ends)], dtype=object)
+
+
+def _locations(rng, count):
+    """Location strings in the formats LinkedIn uses, with some blanks and remote posts"""
+    rules = load_region_rules()
+    region_of = {city: region for region, cities in rules for city in cities}
+    other = [city for city in region_of if city not in CITY_WEIGHTS]
+    cities = list(CITY_WEIGHTS) + other
+    rest = 1 - sum(CITY_WEIGHTS.values()) - 0.07
+    weights = list(CITY_WEIGHTS.values()) + [rest / len(other)] * len(other)
+
+    # Every combination is formatted once and then sampled
+    choices = [fmt.format(city=city, region=region_of[city]) for city in cities for fmt in LOCATION_FORMATS]
+    choice_weights = [weight / len(LOCATION_FORMATS) for weight in weights for _ in LOCATION_FORMATS]
+    choices += ['Saudi Arabia', 'Remote', None]
+    choice_weights += [0.04, 0.02, 0.01]
+    p = np.array(choice_weights) / sum(choice_weights)
+    return np.array(choices, dtype=object)[rng.choice(len(choices), size=count, p=p)]
+
+
+def synthetic_postings(rows, seed=0, unique_descriptions=0.8):
+    """Raw postings with the columns of the original workbook
+
+    Descriptions are drawn from a pool of rows * unique_descriptions
+    distinct texts, since real postings are often re-posted verbatim.
+    """
+    rng = np.random.default_rng(seed)
+    descriptions = _descriptions(rng, max(1, int(rows * unique_descriptions)))
+    description = descriptions[rng.integers(0, len(descriptions), size=rows)]
+
+    industries = np.array(INDUSTRIES + [None], dtype=object)
+    industry_p = np.append(INDUSTRY_WEIGHTS, 0.02)
+
+    return pd.DataFrame({
+        'position': np.char.add('Position ', rng.integers(0, 5000, size=rows).astype(str)).astype(object),
+        'company': np.char.add('Company ', rng.integers(0, 2000, size=rows).astype(str)).astype(object),
+        'level': np.array(LEVELS + [None], dtype=object)[rng.choice(len(LEVELS) + 1, size=rows,
+                                                                   p=np.append(LEVEL_WEIGHTS, 0.05) / 1.05)],
+        'location': _locations(rng, rows),
+        'industries': industries[rng.choice(len(industries), size=rows, p=industry_p / industry_p.sum())],
+        'description': description,
+        'date': pd.Timestamp('2020-01-01') + pd.to_timedelta(rng.integers(0, 366, size=rows), unit='D'),
+    })
+
+
+def parse_rows(text):
+    """Row counts like 10k, 1M or 2500"""
+    text = text.strip().lower()
+    scale = {'k': 1_000, 'm': 1_000_000}.get(text[-1:], 1)
+    return int(float(text.rstrip('km')) * scale)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Write reproducible synthetic LinkedIn postings')
+    parser.add_argument('--rows', default='100k', help='number of postings, e.g. 10k, 1M')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default='synthetic_postings.parquet', help='Parquet, Arrow or CSV file')
+    args = parser.parse_args()
+
+    from storage import write_table
+    df = synthetic_postings(parse_rows(args.rows), args.seed)
+    write_table(df, args.output)
+    print(f"{len(df):,} synthetic postings saved to '{args.output}'")
+
+
+if __name__ == '__main__':
+    main()
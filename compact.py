@@ -0,0 +1,162 @@
+# Memory-compact representation of the processed (and enhanced) job table
+import os
+
+import numpy as np
+import pandas as pd
+
+from keywords import keyword_groups
+from storage import CATEGORICAL_COLUMNS, _require_pyarrow
+
+# Label columns held as categoricals
+LABEL_COLUMNS = CATEGORICAL_COLUMNS + ['seniority_level', 'work_model']
+
+# Smallest dtypes that hold every value of these columns
+NUMERIC_DTYPES = {'day': 'uint8', 'month': 'uint8', 'quarter': 'uint8', 'year_of_ex': 'uint8',
+                  'is_remote': 'uint8', 'description_length': 'uint32', 'job_attractiveness_score': 'uint8',
+                  'cluster_id': 'uint32'}
+
+# Comma-joined label lists stored as bitmasks; bit i is label i of the keyword group
+BITMASK_COLUMNS = {'skills': 'skills', 'benefits': 'benefits', 'language_requirements': 'languages'}
+
+# DataFrame.attrs entry holding the labels each bitmask column was encoded with.
+# Parquet and Arrow files keep attrs in their schema metadata, so a table reads
+# back with the vocabulary it was written with, whatever the current config.
+LABELS_ATTR = 'bitmask_labels'
+
+
+def bitmask_labels(column):
+    return list(keyword_groups[BITMASK_COLUMNS[column]])
+
+
+def stored_labels(df, column):
+    """Labels the bitmasks of a column of df were encoded with, the current vocabulary if df does not say"""
+    return df.attrs.get(LABELS_ATTR, {}).get(column) or bitmask_labels(column)
+
+
+def bitmask_dtype(labels):
+    for dtype in ('uint8', 'uint16', 'uint32', 'uint64'):
+        if len(labels) <= np.iinfo(dtype).bits:
+            return dtype
+    raise ValueError(f'Too many labels for a bitmask: {len(labels)}')
+
+
+def encode_bitmask(series, labels):
+    """Comma-joined label lists as integers with bit i set for labels[i]; NaN becomes 0"""
+    bits = {label: 1 << i for i, label in enumerate(labels)}
+    codes, uniques = pd.factorize(series)
+    masks = np.zeros(len(uniques) + 1, dtype=np.uint64)
+    for i, value in enumerate(uniques):
+        try:
+            masks[i] = sum(bits[label] for label in value.split(', '))
+        except KeyError as e:
+            raise ValueError(f'{series.name}: {e.args[0]!r} is not one of {labels}') from None
+    # Code -1 (NaN) picks the trailing 0
+    return pd.Series(masks[codes].astype(bitmask_dtype(labels)), index=series.index, name=series.name)
+
+
+def decode_bitmask(series, labels):
+    """Inverse of encode_bitmask: comma-joined labels in vocabulary order, NaN for 0"""
+    joined = {mask: ', '.join(label for i, label in enumerate(labels) if int(mask) >> i & 1) or np.nan
+              for mask in series.unique()}
+    return series.map(joined).astype(object)
+
+
+def memory_map_column(series, path):
+    """Move a text column into an uncompressed Arrow file and read it back memory-mapped
+
+    The returned column is backed by the file's pages instead of the heap,
+    so the OS can page the text in and out as it is used.
+    """
+    pa = _require_pyarrow()
+    import pyarrow.feather as feather
+    table = pa.table({series.name: pa.array(series.astype(object), type=pa.string(), from_pandas=True)})
+    feather.write_feather(table, path, compression='uncompressed')
+    mapped = feather.read_table(path, memory_map=True)
+    return pd.Series(pd.arrays.ArrowExtensionArray(mapped.column(0)), index=series.index, name=series.name)
+
+
+def compact_frame(df, description='keep', mmap_dir='.', bitmasks=True):
+    """Return a memory-compact copy of df and the bytes saved per column
+
+    Label columns become categoricals, the numeric columns of
+    NUMERIC_DTYPES are downcast when every value fits, and the label-list
+    columns become bitmasks (unless bitmasks=False). description is 'keep',
+    'drop' or 'mmap' (moved to an Arrow file in mmap_dir and memory-mapped,
+    which counts as freed heap in the report).
+    """
+    if description not in ('keep', 'drop', 'mmap'):
+        raise ValueError(f"description must be 'keep', 'drop' or 'mmap', not {description!r}")
+    before = df.memory_usage(deep=True, index=False)
+    dtypes_before = df.dtypes.astype(str)
+    df = df.copy()
+    freed = set()
+
+    for column in LABEL_COLUMNS:
+        if column in df.columns and not isinstance(df[column].dtype, pd.CategoricalDtype):
+            df[column] = df[column].astype('category')
+
+    for column, dtype in NUMERIC_DTYPES.items():
+        if column not in df.columns or not pd.api.types.is_numeric_dtype(df[column]):
+            continue
+        values = df[column]
+        info = np.iinfo(dtype)
+        if values.notna().all() and (values % 1 == 0).all() and values.min() >= info.min and values.max() <= info.max:
+            df[column] = values.astype(dtype)
+
+    if bitmasks:
+        for column in BITMASK_COLUMNS:
+            if column in df.columns and not pd.api.types.is_integer_dtype(df[column]):
+                labels = bitmask_labels(column)
+                df[column] = encode_bitmask(df[column], labels)
+                df.attrs[LABELS_ATTR] = {**df.attrs.get(LABELS_ATTR, {}), column: labels}
+
+    if 'description' in df.columns:
+        if description == 'drop':
+            df = df.drop(columns='description')
+        elif description == 'mmap':
+            os.makedirs(mmap_dir, exist_ok=True)
+            df['description'] = memory_map_column(df['description'], os.path.join(mmap_dir, 'description.arrow'))
+            freed.add('description')
+
+    after = df.memory_usage(deep=True, index=False).reindex(before.index, fill_value=0)
+    after[list(freed)] = 0
+    report = pd.DataFrame({
+        'dtype_before': dtypes_before,
+        'dtype_after': df.dtypes.astype(str).reindex(before.index, fill_value='dropped'),
+        'bytes_before': before,
+        'bytes_after': after,
+    })
+    report.loc[list(freed), 'dtype_after'] += ' (memory-mapped)'
+    report['bytes_saved'] = report['bytes_before'] - report['bytes_after']
+    return df, report
+
+
+def add_savings(left, right):
+    """Add the byte counts of two compact_frame reports (e.g. of two chunks)"""
+    if left is None:
+        return right
+    total = right.copy()
+    for column in ('bytes_before', 'bytes_after', 'bytes_saved'):
+        total[column] = left[column].add(right[column], fill_value=0)
+    return total
+
+
+def expand_frame(df):
+    """Turn bitmask columns back into comma-joined labels, for code that expects the strings"""
+    df = df.copy()
+    for column in BITMASK_COLUMNS:
+        if column in df.columns and pd.api.types.is_integer_dtype(df[column]):
+            df[column] = decode_bitmask(df[column], stored_labels(df, column))
+    df.attrs.pop(LABELS_ATTR, None)
+    return df
+
+
+def print_savings(report):
+    print('\n=== MEMORY ===')
+    for column, row in report.sort_values('bytes_saved', ascending=False).iterrows():
+        print(f"{column:<26} {row['dtype_before']:>16} -> {row['dtype_after']:<30} "
+              f"{row['bytes_before'] / 2 ** 20:9.2f} MB -> {row['bytes_after'] / 2 ** 20:9.2f} MB "
+              f"({row['bytes_saved'] / 2 ** 20:,.2f} MB saved)")
+    total_before, total_after = report['bytes_before'].sum(), report['bytes_after'].sum()
+    print(f"Total: {total_before / 2 ** 20:,.2f} MB -> {total_after / 2 ** 20:,.2f} MB "
+          f"({100 * (1 - total_after / total_before) if total_before else 0:.1f}% saved)")
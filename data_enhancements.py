@@ -1,78 +1,43 @@
 # Data Enhancement Functions for LinkedIn Jobs Dataset
-import pandas as pd
-import numpy as np
+#
+# The row functions are plain Python; pandas and numpy are imported by the
+# column-wise functions that need them, so workers and short scripts can use
+# the row functions without loading them.
 import re
-from datetime import datetime
+from math import nan
+from keywords import scan_keywords, first_match, all_matches, keyword_groups, seniority_keywords
+from extraction import is_missing
 
 def extract_job_type(description):
     """Extract job type (full-time, part-time, contract, internship)"""
-    if pd.isna(description):
-        return np.nan
-    
-    description = description.lower()
-    if any(word in description for word in ['full time', 'full-time', 'permanent']):
-        return 'Full-time'
-    elif any(word in description for word in ['part time', 'part-time']):
-        return 'Part-time'
-    elif any(word in description for word in ['contract', 'contractor', 'freelance']):
-        return 'Contract'
-    elif any(word in description for word in ['intern', 'internship', 'trainee']):
-        return 'Internship'
-    else:
-        return 'Not Specified'
+    if is_missing(description):
+        return nan
+    return first_match(scan_keywords(description.lower(), ('job_type',)), 'job_type', 'Not Specified')
 
 def extract_company_size(description):
     """Extract company size indicators"""
-    if pd.isna(description):
-        return np.nan
-    
-    description = description.lower()
-    if any(word in description for word in ['startup', 'small company', 'growing team']):
-        return 'Small'
-    elif any(word in description for word in ['medium', 'established', '100+ employees']):
-        return 'Medium'
-    elif any(word in description for word in ['large', 'multinational', 'global', 'fortune', '1000+ employees']):
-        return 'Large'
-    else:
-        return 'Unknown'
+    if is_missing(description):
+        return nan
+    return first_match(scan_keywords(description.lower(), ('company_size',)), 'company_size', 'Unknown')
 
 def extract_benefits(description):
     """Extract job benefits mentioned"""
-    if pd.isna(description):
-        return np.nan
-    
-    benefits = []
-    description = description.lower()
-    
-    benefit_keywords = {
-        'health_insurance': ['health insurance', 'medical', 'healthcare'],
-        'housing_allowance': ['housing', 'accommodation', 'housing allowance'],
-        'transportation': ['transportation', 'transport', 'car allowance'],
-        'training': ['training', 'development', 'courses', 'certification'],
-        'vacation': ['vacation', 'annual leave', 'paid leave'],
-        'bonus': ['bonus', 'incentive', 'commission']
-    }
-    
-    for benefit, keywords in benefit_keywords.items():
-        if any(keyword in description for keyword in keywords):
-            benefits.append(benefit)
-    
-    return ', '.join(benefits) if benefits else np.nan
+    if is_missing(description):
+        return nan
+    benefits = all_matches(scan_keywords(description.lower(), ('benefits',)), 'benefits')
+    return ', '.join(benefits) if benefits else nan
 
 def categorize_seniority(level, years_exp):
     """Categorize job seniority based on level and experience"""
-    if pd.isna(level):
+    if is_missing(level):
         level = ''
     
     level = str(level).lower()
     
-    if any(word in level for word in ['entry', 'junior', 'intern', 'graduate']):
-        return 'Entry Level'
-    elif any(word in level for word in ['senior', 'lead', 'principal']):
-        return 'Senior Level'
-    elif any(word in level for word in ['manager', 'director', 'head', 'chief']):
-        return 'Management'
-    elif years_exp <= 2:
+    for seniority, words in seniority_keywords.items():
+        if any(word in level for word in words):
+            return seniority
+    if years_exp <= 2:
         return 'Entry Level'
     elif years_exp <= 5:
         return 'Mid Level'
@@ -86,53 +51,32 @@ def extract_work_model(description, regions):
     if 'Remote' in str(regions):
         return 'Remote'
     
-    if pd.isna(description):
+    if is_missing(description):
         return 'On-site'
     
-    description = description.lower()
-    if any(word in description for word in ['remote', 'work from home', 'wfh']):
-        return 'Remote'
-    elif any(word in description for word in ['hybrid', 'flexible']):
-        return 'Hybrid'
-    else:
-        return 'On-site'
+    return first_match(scan_keywords(description.lower(), ('work_model',)), 'work_model', 'On-site')
 
 def extract_language_requirements(description):
     """Extract language requirements"""
-    if pd.isna(description):
-        return np.nan
-    
-    languages = []
-    description = description.lower()
-    
-    language_patterns = {
-        'arabic': ['arabic', 'عربي'],
-        'english': ['english', 'fluent english'],
-        'french': ['french'],
-        'german': ['german'],
-        'spanish': ['spanish']
-    }
-    
-    for lang, patterns in language_patterns.items():
-        if any(pattern in description for pattern in patterns):
-            languages.append(lang)
-    
-    return ', '.join(languages) if languages else np.nan
+    if is_missing(description):
+        return nan
+    languages = all_matches(scan_keywords(description.lower(), ('languages',)), 'languages')
+    return ', '.join(languages) if languages else nan
 
 def calculate_job_attractiveness_score(row):
     """Calculate job attractiveness score based on multiple factors"""
     score = 0
     
     # Salary mentioned (+2)
-    if pd.notna(row.get('salary_mentioned')):
+    if not is_missing(row.get('salary_mentioned')):
         score += 2
     
     # Skills mentioned (+1)
-    if pd.notna(row.get('skills')):
+    if not is_missing(row.get('skills')):
         score += 1
     
     # Benefits mentioned (+1)
-    if pd.notna(row.get('benefits')):
+    if not is_missing(row.get('benefits')):
         score += 1
     
     # Remote work (+1)
@@ -145,32 +89,118 @@ def calculate_job_attractiveness_score(row):
     
     return score
 
+def contains_any(text, words):
+    """Vectorized test of whether each string contains any of the words"""
+    return text.str.contains('|'.join(re.escape(word) for word in words), regex=True, na=False)
+
+def keyword_masks(text, group):
+    """One boolean mask per label of a keyword group, in priority order"""
+    return {label: contains_any(text, words) for label, words in keyword_groups[group].items()}
+
+def select_label(masks, default, index):
+    """Highest-priority label whose mask is set, else default"""
+    import numpy as np
+    import pandas as pd
+    labels = np.select(list(masks.values()), list(masks.keys()), default) if masks else default
+    return pd.Series(labels, index=index, dtype=object)
+
+def join_labels(masks, index):
+    """Comma-joined labels whose masks are set, NaN when none is
+
+    The masks are packed into one integer code per row, so the join runs once
+    per distinct combination instead of once per row.
+    """
+    import numpy as np
+    import pandas as pd
+    labels = list(masks)
+    codes = np.zeros(len(index), dtype=np.int64)
+    for bit, label in enumerate(labels):
+        codes |= masks[label].to_numpy().astype(np.int64) << bit
+    joined = {code: ', '.join(label for bit, label in enumerate(labels) if code >> bit & 1) or nan
+              for code in np.unique(codes)}
+    return pd.Series(codes, index=index).map(joined).astype(object)
+
+def seniority_levels(df):
+    """Column-wise categorize_seniority: from the job level, then from the years of experience"""
+    import numpy as np
+    import pandas as pd
+    index = df.index
+    level = df['level'].astype(object).where(df['level'].notna(), '').astype(str).str.lower()
+    years = df['year_of_ex'] if 'year_of_ex' in df.columns else pd.Series(0, index=index)
+    conditions = [contains_any(level, words) for words in seniority_keywords.values()]
+    conditions += [years <= 2, years <= 5, years > 5]
+    choices = list(seniority_keywords) + ['Entry Level', 'Mid Level', 'Senior Level']
+    return pd.Series(np.select(conditions, choices, 'Mid Level'), index=index, dtype=object)
+
 def enhance_dataset(df):
-    """Apply all enhancement functions to the dataset"""
+    """Apply all enhancement functions to the dataset
+
+    Column-wise equivalent of applying the row functions above: keyword
+    columns come from vectorized substring masks and the rest from np.select
+    and boolean arithmetic.
+    """
+    import pandas as pd
+
     print("Enhancing dataset with additional features...")
     
-    # Apply enhancement functions
-    df['job_type'] = df['description'].apply(extract_job_type)
-    df['company_size'] = df['description'].apply(extract_company_size)
-    df['benefits'] = df['description'].apply(extract_benefits)
-    df['seniority_level'] = df.apply(lambda x: categorize_seniority(x['level'], x.get('year_of_ex', 0)), axis=1)
-    df['work_model'] = df.apply(lambda x: extract_work_model(x['description'], x['Regions']), axis=1)
-    df['language_requirements'] = df['description'].apply(extract_language_requirements)
-    df['job_attractiveness_score'] = df.apply(calculate_job_attractiveness_score, axis=1)
+    index = df.index
+    missing = df['description'].isna().to_numpy()
+    text = df['description'].str.lower()
+
+    # Keyword columns; a missing description gives NaN
+    df['job_type'] = select_label(keyword_masks(text, 'job_type'), 'Not Specified', index).where(~missing)
+    df['company_size'] = select_label(keyword_masks(text, 'company_size'), 'Unknown', index).where(~missing)
+    df['benefits'] = join_labels(keyword_masks(text, 'benefits'), index).where(~missing)
+
+    df['seniority_level'] = seniority_levels(df)
+
+    # Work model: a Remote region wins, then the description keywords
+    masks = {'Remote': df['Regions'].astype(str).str.contains('Remote', regex=False, na=False)}
+    for label, mask in keyword_masks(text, 'work_model').items():
+        masks[label] = masks.get(label, False) | mask
+    df['work_model'] = select_label(masks, 'On-site', index)
+
+    df['language_requirements'] = join_labels(keyword_masks(text, 'languages'), index).where(~missing)
+
+    # Job attractiveness score: a weighted sum of boolean columns
+    def present(column):
+        return df[column].notna() if column in df.columns else pd.Series(False, index=index)
+
+    length = df['description_length'] if 'description_length' in df.columns else pd.Series(0, index=index)
+    df['job_attractiveness_score'] = (2 * present('salary_mentioned').astype(int)
+                                      + present('skills').astype(int)
+                                      + present('benefits').astype(int)
+                                      + (df['work_model'] == 'Remote').astype(int)
+                                      + (length > 500).astype(int))
     
     print("Enhancement completed!")
     return df
 
 # Usage example:
 if __name__ == "__main__":
-    # Load your processed data
-    df = pd.read_csv('data_jobs.csv')
+    import argparse
+    from storage import read_table, write_table
+    from compact import compact_frame, expand_frame, print_savings
+
+    parser = argparse.ArgumentParser(description='Add enhanced features to the processed LinkedIn job posts')
+    parser.add_argument('--input', default='data_jobs.parquet', help='output of text_processing.py')
+    parser.add_argument('--output', default='data_jobs_enhanced.parquet', help='Parquet, Arrow or CSV file to write')
+    parser.add_argument('--compact', action='store_true',
+                        help='write small integer, categorical and bitmask columns (see compact.py)')
+    parser.add_argument('--drop-description', action='store_true', help='with --compact, leave out the description')
+    args = parser.parse_args()
+
+    # Load your processed data (bitmask columns of a compact table back to labels)
+    df = expand_frame(read_table(args.input))
     
     # Enhance the dataset
-    df_enhanced = enhance_dataset(df)
+    df_enhanced = enhance_dataset(df.copy())
     
     # Save enhanced dataset
-    df_enhanced.to_csv('data_jobs_enhanced.csv', index=False)
+    if args.compact:
+        df_enhanced, report = compact_frame(df_enhanced, 'drop' if args.drop_description else 'keep')
+        print_savings(report)
+    write_table(df_enhanced, args.output)
     
     print(f"Enhanced dataset saved with {len(df_enhanced.columns)} columns")
-    print(f"New columns added: {[col for col in df_enhanced.columns if col not in df.columns]}")
\ No newline at end of file
+    print(f"New columns added: {[col for col in df_enhanced.columns if col not in df.columns]}")
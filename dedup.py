@@ -0,0 +1,270 @@
+# Near-duplicate postings: MinHash signatures of description shingles, clustered with LSH banding
+import numpy as np
+import pandas as pd
+
+# Defaults: 16 bands of 4 bins make pairs above ~0.5 Jaccard similarity candidates, which
+# are kept when their signatures agree on at least THRESHOLD of the bins
+NUM_PERM = 64
+BANDS = 16
+SHINGLE_SIZE = 3
+THRESHOLD = 0.8
+
+MAX_HASH = np.uint64((1 << 32) - 1)
+MIX = np.uint64(0x9E3779B97F4A7C15)
+
+# Value of a signature bin no shingle fell into, and the offset per bin an empty bin borrows across
+EMPTY = np.uint32((1 << 32) - 1)
+ROTATION = np.uint32(0x9E3779B1)
+
+# Texts per block of signatures, bounding the token lists and shingle arrays held at once
+SIGNATURE_BLOCK = 20_000
+
+# Candidates per description and band: the following descriptions of its bucket, and the
+# descriptions of earlier chunks sharing the bucket
+BUCKET_CANDIDATES = 8
+
+
+def mix64(values):
+    """splitmix64 finalizer: spreads every input bit over all 64 output bits"""
+    values = values ^ (values >> np.uint64(30))
+    values = values * np.uint64(0xBF58476D1CE4E5B9)
+    values = values ^ (values >> np.uint64(27))
+    values = values * np.uint64(0x94D049BB133111EB)
+    return values ^ (values >> np.uint64(31))
+
+
+def shingle_hashes(texts, size=SHINGLE_SIZE):
+    """64-bit hashes of the word shingles of every text, concatenated, with per-text offsets
+
+    Words are hashed once with pandas' vectorized hash; a shingle hash
+    combines the hashes of its words. Texts shorter than size words have one
+    shingle of all their words, and empty texts have none.
+    """
+    words = [text.split() for text in texts]
+    lengths = np.fromiter((len(text) for text in words), dtype=np.int64, count=len(words))
+    tokens = pd.util.hash_array(np.array([word for text in words for word in text], dtype=object))
+    starts = np.cumsum(lengths) - lengths
+
+    counts = np.where(lengths >= size, lengths - size + 1, (lengths > 0).astype(np.int64))
+    position = np.repeat(starts, counts) + np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    ends = np.repeat(starts + lengths, counts)
+
+    hashes = np.zeros(len(position), dtype=np.uint64)
+    for offset in range(size):
+        index = np.minimum(position + offset, len(tokens) - 1)
+        hashes = hashes * MIX + np.where(position + offset < ends, tokens[index], np.uint64(0))
+    return hashes, np.concatenate([[0], np.cumsum(counts)])
+
+
+def bucket_pairs(keys, limit=BUCKET_CANDIDATES):
+    """(i, j) pairs of positions with equal keys, each i paired with the next limit of its bucket"""
+    order = np.argsort(keys, kind='stable')
+    sorted_keys = keys[order]
+    left, right = [], []
+    for step in range(1, limit + 1):
+        same = np.flatnonzero(sorted_keys[step:] == sorted_keys[:-step])
+        if not len(same):
+            break
+        left.append(order[same])
+        right.append(order[same + step])
+    return left, right
+
+
+def unique_pairs(left, right, n):
+    """The distinct (left, right) pairs, for right < n"""
+    codes = np.sort(left * n + right)
+    codes = codes[np.r_[True, codes[1:] != codes[:-1]]] if len(codes) else codes
+    return codes // n, codes % n
+
+
+def merge_sorted(keys, values, new_keys, new_values):
+    """Sorted keys with their values after adding new ones; on ties the older value comes first"""
+    order = np.argsort(new_keys, kind='stable')
+    keys = np.concatenate([keys, new_keys[order]])
+    values = np.concatenate([values, new_values[order]])
+    # Two sorted runs: the stable sort merges them in linear time
+    order = np.argsort(keys, kind='stable')
+    return keys[order], values[order]
+
+
+def connected_components(n, u, v):
+    """Smallest node of the component of every node 0..n-1, for edges (u, v)
+
+    Min-label propagation with pointer jumping, in NumPy; a few rounds suffice
+    for the small, shallow clusters near-duplicates form.
+    """
+    labels = np.arange(n)
+    while len(u):
+        low = np.minimum(labels[u], labels[v])
+        np.minimum.at(labels, u, low)
+        np.minimum.at(labels, v, low)
+        while True:
+            jumped = labels[labels]
+            if (jumped == labels).all():
+                break
+            labels = jumped
+        if (labels[u] == labels[v]).all():
+            break
+    return labels
+
+
+class NearDuplicates:
+    """Clusters near-duplicate descriptions, chunk after chunk
+
+    Each distinct description gets a MinHash signature of its word shingles.
+    LSH splits the signature into bands; descriptions sharing a band are
+    candidates, kept when their signatures agree on at least threshold of
+    the bins (their estimated Jaccard similarity). Clusters are the
+    connected components of the kept pairs, so the work grows with the
+    number of postings and not with the number of pairs.
+
+    Every description seen is remembered (text hash, band keys, signature
+    and cluster), so a posting in a later chunk joins the cluster of an
+    earlier near-duplicate, and a repeated description is not hashed again.
+    """
+
+    def __init__(self, num_perm=NUM_PERM, bands=BANDS, shingle_size=SHINGLE_SIZE, threshold=THRESHOLD, seed=1):
+        if num_perm % bands:
+            raise ValueError(f'num_perm ({num_perm}) must be a multiple of bands ({bands})')
+        self.num_perm = num_perm
+        self.bands = bands
+        self.shingle_size = shingle_size
+        self.threshold = threshold
+        self._seed = mix64(np.array([seed], dtype=np.uint64))
+
+        # Descriptions seen, by id: signature and cluster; sorted text hashes with their ids;
+        # per band, sorted band keys with the ids of the descriptions holding them
+        self._signatures = np.zeros((0, num_perm), dtype=np.uint32)
+        self._clusters = np.zeros(0, dtype=np.int64)
+        self._texts = np.zeros(0, dtype=np.uint64)
+        self._text_ids = np.zeros(0, dtype=np.int64)
+        self._keys = [np.zeros(0, dtype=np.uint64) for _ in range(bands)]
+        self._key_ids = [np.zeros(0, dtype=np.int64) for _ in range(bands)]
+        self.clusters = 0
+        self.stats = {'rows': 0, 'duplicates': 0}
+
+    def signatures(self, texts):
+        """One-permutation MinHash signatures (texts x num_perm, uint32)
+
+        Each shingle is hashed once: the high bits pick one of num_perm bins
+        and the bin keeps the minimum of the low bits. An empty bin takes the
+        value of the next non-empty one, offset by the distance (rotation
+        densification), so two signatures still agree on a bin with the
+        Jaccard similarity of their shingle sets as probability, at one hash
+        per shingle instead of num_perm. Texts without shingles get EMPTY
+        everywhere.
+        """
+        signatures = np.full((len(texts), self.num_perm), EMPTY, dtype=np.uint32)
+        bins = np.arange(self.num_perm)
+        for start in range(0, len(texts), SIGNATURE_BLOCK):
+            hashes, offsets = shingle_hashes(texts[start:start + SIGNATURE_BLOCK], self.shingle_size)
+            mixed = mix64(hashes ^ self._seed)
+            bin_of = ((mixed >> np.uint64(32)) * np.uint64(self.num_perm)) >> np.uint64(32)
+            text_of = np.repeat(np.arange(len(offsets) - 1), np.diff(offsets))
+            block = signatures[start:start + SIGNATURE_BLOCK]
+            np.minimum.at(block.reshape(-1), text_of * self.num_perm + bin_of.astype(np.int64),
+                          np.minimum(mixed & MAX_HASH, EMPTY - 1).astype(np.uint32))
+
+            empty = block == EMPTY
+            rows = np.flatnonzero(empty.any(axis=1) & ~empty.all(axis=1))
+            position = np.where(block[rows] != EMPTY, bins, 4 * self.num_perm)
+            position = np.concatenate([position, position + self.num_perm], axis=1)
+            following = np.minimum.accumulate(position[:, ::-1], axis=1)[:, ::-1][:, :self.num_perm]
+            source = np.take_along_axis(block[rows], following % self.num_perm, axis=1)
+            block[rows] = source + ((following - bins) * ROTATION).astype(np.uint32)
+        return signatures
+
+    def band_keys(self, signatures):
+        """One 64-bit key per band of every signature (texts x bands)"""
+        rows = self.num_perm // self.bands
+        keys = np.zeros((len(signatures), self.bands), dtype=np.uint64)
+        for i in range(rows):
+            keys = keys * MIX + signatures[:, i::rows].astype(np.uint64)
+        return keys
+
+    def _similar(self, left, right):
+        return (left == right).mean(axis=1) >= self.threshold
+
+    def _candidates(self, keys):
+        """Candidate (new, new) pairs of positions in keys, and (new, earlier id) pairs"""
+        left, right, new, earlier = [np.zeros(0, dtype=np.int64)], [np.zeros(0, dtype=np.int64)], [], []
+        for band in range(self.bands):
+            band_left, band_right = bucket_pairs(keys[:, band])
+            left += band_left
+            right += band_right
+
+            known = self._keys[band]
+            first = np.searchsorted(known, keys[:, band], 'left')
+            count = np.minimum(np.searchsorted(known, keys[:, band], 'right') - first, BUCKET_CANDIDATES)
+            within = np.arange(count.sum()) - np.repeat(np.cumsum(count) - count, count)
+            new.append(np.repeat(np.arange(len(keys)), count))
+            earlier.append(self._key_ids[band][np.repeat(first, count) + within])
+        return (np.concatenate(left), np.concatenate(right)), (np.concatenate(new), np.concatenate(earlier))
+
+    def assign(self, df, column='description'):
+        """df with cluster_id and is_canonical columns
+
+        cluster_id numbers clusters in order of first appearance; the first
+        posting of a cluster is canonical, later ones (exact or near
+        duplicates) are not.
+        """
+        codes, uniques = pd.factorize(df[column].astype(object).fillna(''))
+        text_hashes = pd.util.hash_array(np.asarray(uniques, dtype=object))
+        position = np.searchsorted(self._texts, text_hashes).clip(max=max(len(self._texts) - 1, 0))
+        seen = (self._texts[position] == text_hashes) if len(self._texts) else np.zeros(len(uniques), dtype=bool)
+        cluster_of = np.empty(len(uniques), dtype=np.int64)
+        cluster_of[seen] = self._clusters[self._text_ids[position[seen]]]
+
+        new = np.flatnonzero(~seen)
+        signatures = self.signatures(np.asarray(uniques, dtype=object)[new].tolist())
+        keys = self.band_keys(signatures)
+        (left, right), (matches, matched) = self._candidates(keys)
+        left, right = unique_pairs(left, right, len(new))
+        keep = self._similar(signatures[left], signatures[right])
+        left, right = left[keep], right[keep]
+        matches, matched = unique_pairs(matches, matched, len(self._clusters))
+        keep = self._similar(signatures[matches], self._signatures[matched])
+        matches, matched = matches[keep], self._clusters[matched[keep]]
+
+        # Connected components; earlier clusters are nodes 0..k-1 (lowest id first), then the new
+        # descriptions in order of appearance, so each component's minimum is its root
+        earlier = np.unique(matched)
+        u = np.concatenate([left, matches]) + len(earlier)
+        v = np.concatenate([right + len(earlier), np.searchsorted(earlier, matched)])
+        labels = connected_components(len(earlier) + len(new), u, v)[len(earlier):]
+
+        joins_earlier = labels < len(earlier)
+        roots = np.unique(labels[~joins_earlier])
+        new_clusters = np.empty(len(new), dtype=np.int64)
+        new_clusters[joins_earlier] = earlier[labels[joins_earlier]]
+        new_clusters[~joins_earlier] = self.clusters + np.searchsorted(roots, labels[~joins_earlier])
+        cluster_of[new] = new_clusters
+        self._remember(text_hashes[new], keys, signatures, new_clusters)
+        self.clusters += len(roots)
+
+        # The canonical posting is the first row holding the root description of a new cluster
+        is_root = np.zeros(len(uniques), dtype=bool)
+        is_root[new[roots - len(earlier)]] = True
+        first_row = np.zeros(len(codes), dtype=bool)
+        first_row[np.unique(codes, return_index=True)[1]] = True
+        df['cluster_id'] = cluster_of[codes]
+        df['is_canonical'] = is_root[codes] & first_row
+        self.stats['rows'] += len(df)
+        self.stats['duplicates'] += int((~df['is_canonical']).sum())
+        return df
+
+    def _remember(self, text_hashes, keys, signatures, clusters):
+        """Add the new descriptions to the lookups of descriptions seen"""
+        ids = len(self._clusters) + np.arange(len(clusters))
+        self._signatures = np.concatenate([self._signatures, signatures])
+        self._clusters = np.concatenate([self._clusters, clusters])
+        self._texts, self._text_ids = merge_sorted(self._texts, self._text_ids, text_hashes, ids)
+        for band in range(self.bands):
+            self._keys[band], self._key_ids[band] = merge_sorted(self._keys[band], self._key_ids[band],
+                                                                 keys[:, band], ids)
+
+    def print_report(self):
+        rows, duplicates = self.stats['rows'], self.stats['duplicates']
+        print('\n=== NEAR DUPLICATES ===')
+        print(f"{rows:,} posts in {self.clusters:,} clusters; {duplicates:,} are exact or near duplicates "
+              f"({100 * duplicates / rows if rows else 0:.1f}%) of a canonical post")
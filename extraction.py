@@ -0,0 +1,218 @@
+# Per-row extractors and their compiled patterns and lookup tables
+#
+# Plain Python only (no pandas or numpy), so the extractors can be imported
+# by worker processes and short-lived scripts without the dataframe stack.
+import re
+from math import nan
+
+from keywords import scan_keywords, first_match, all_matches
+
+# Experience requirement, matched on the description before stopwords are removed
+EXPERIENCE_PATTERN = ('[^0-9]\\+ years|[^0-9]\\+ year|[0-9] [0-9]\\+ years|[0-9] [0-9]\\+ year|\\+[0-9]|'
+                      '[0-9] to [0-9] year|[0-9] to [0-9] years|[0-9] to [0-9] yrs|[0-9] [0-9] yrs|[^0-9] +year|'
+                      '[0-9] +years|..\\+ yrs|[0-9] [0-9] +years|entry|junior')
+
+# Degree terms, including the forms left after stopword removal (bachelor -> bchel...)
+DEGREE_TERMS = ['bachelor', 'master', 'masters', ' ms ', ' bs ', ' phd ', ' msc ', 'university', 'technicl degree',
+                'mster', 'bchel', 'bchels', 'msters', 'diplom', ' hve ', 'needbchels', 'experiencebchels',
+                'requirementsbchels', 'college', 'qulifictionsbchels', 'electricl ', 'undergrdute', 'grdute',
+                'mechnicl']
+
+# Salary mention; the backslashes are literal, as in the original script
+SALARY_PATTERN = r'\\d+[,\\d]*\\s*(?:sar|riyal|sr|salary|k|thousand)'
+
+EXPERIENCE = re.compile(EXPERIENCE_PATTERN)
+DEGREE = re.compile('|'.join(DEGREE_TERMS))
+SALARY = re.compile(SALARY_PATTERN)
+
+# Numeric labels used to average degrees per level
+degree_codes = {'Higher Vocational Education': 1, 'bachelor': 2, 'diploma': 3,
+                'master': 4, 'student': 5, 'Doctorate': 6}
+
+# Replacements turning a matched degree term into its label, applied in order
+DEGREE_REPLACEMENTS = [
+    (' ', ''),
+    ('undergrdute', 'student'),
+    ('needbchels', 'bachelor'), ('experiencebchels', 'bachelor'),
+    ('requirementsbchels', 'bachelor'), ('qulifictionsbchels', 'bachelor'),
+    ('bchel', 'bachelor'), ('bs', 'bachelor'), ('grdute', 'bachelor'), ('college', 'bachelor'),
+    ('university', 'bachelor'),
+    ('master', 'master'), ('msc', 'master'), ('masters', 'master'), ('ms', 'master'), ('mster', 'master'),
+    ('msters', 'master'), ('masterter', 'master'), (' master', 'master'),
+    ('technicldegree', 'diplom'), ('electricl', 'diplom'), ('mechnicl', 'diplom'),
+    ('phd', 'Doctorate'),
+    ('hve', 'Higher Vocational Education'),
+    ('diplom', 'diploma'),
+]
+
+# Stopwords removed from description
+spec_char = ["in", "or", "and", "from", "is", "a", "that", "with", "at", "of"]
+
+DEGREE_LABEL = re.compile('(Higher Vocational Education|bachelor|diploma|master|student|Doctorate)')
+DIGIT = re.compile(r'\d')
+
+# Keyword groups extract_keyword_fields reads, scanned together
+KEYWORD_FIELD_GROUPS = ('skills', 'job_type', 'company_size')
+
+
+def degree_label(term):
+    """Label of a matched degree term, e.g. ' msc ' -> 'master'"""
+    for old, new in DEGREE_REPLACEMENTS:
+        term = term.replace(old, new)
+    return term
+
+
+def degree_code(label):
+    """Numeric code of the first known label in a degree label, NaN if there is none"""
+    match = DEGREE_LABEL.search(label)
+    return float(degree_codes[match.group()]) if match else nan
+
+
+# Every term DEGREE can match, mapped once to its label and code
+DEGREE_LABELS = {term: degree_label(term) for term in DEGREE_TERMS}
+DEGREE_CODES = {term: degree_code(label) for term, label in DEGREE_LABELS.items()}
+
+
+def experience_years(match):
+    """Years of experience in a matched requirement: its first digit, NaN if it has none"""
+    digit = DIGIT.search(match)
+    return float(digit.group()) if digit else nan
+
+
+def match_experience(text):
+    """Matched experience requirement and its years, or NaN for both"""
+    match = EXPERIENCE.search(text)
+    if match is None:
+        return nan, nan
+    return match.group(), experience_years(match.group())
+
+
+def match_degree_and_salary(text):
+    """Degree label and code and salary mention of a text
+
+    Two searches rather than one alternation of both patterns: salary
+    mentions are rare, and a combined pattern has to scan every text to its
+    end, while SALARY alone skips ahead to its literal backslash.
+    """
+    term = DEGREE.search(text)
+    salary = SALARY.search(text)
+    salary = salary.group() if salary else nan
+    if term is None:
+        return nan, nan, salary
+    return DEGREE_LABELS[term.group()], DEGREE_CODES[term.group()], salary
+
+
+def is_missing(value):
+    """pd.isna for a single value, without importing pandas"""
+    if value is None:
+        return True
+    try:
+        return bool(value != value)
+    except TypeError:
+        # pd.NA compares to NA, which has no truth value
+        return True
+
+
+# Remove common text in job description
+def rem_fluff(data):
+    data = data.replace('please share resume', " ")
+    data = data.replace('call me', " ")
+    data = data.replace('if you are a', " ")
+    data = data.replace('if you are an', " ")
+    data = data.replace('job description', " ")
+    data = data.replace('if you are', " ")
+    data = data.replace('reply', " ")
+    data = data.replace("please apply today applicants must be authorized to work in the u.s.please apply directly to by clicking 'click here to apply' with your word resume looking forward to receiving your resume and going over the position in more detail with you.- not a fit for this position click the link at the bottom of this email to search all of our open positions.looking forward to receiving your resume cybercoderscybercoders inc is proud to be an equal opportunity employerall qualified applicants will receive consideration for employment without regard to race color religion sex national origin disability protected veteran status or any other characteristic protected by law.your right to work - in compliance with federal law all persons hired will be required to verify identity and eligibility to work in the united states and to complete the required employment eligibility verification document form upon hire.copyright  - . cybercoders inc. all rights reserved.", ' ')
+    return data
+
+
+def years_of_ex(description):
+    if description != nan:
+        description = description.lower()
+        match = EXPERIENCE.search(description)
+        if match != None:
+            return description[match.start(): match.end()]
+    return nan
+
+
+def degree(description):
+    if description != nan:
+        description = description.lower()
+        match = DEGREE.search(description)
+        if match != None:
+            return description[match.start(): match.end()]
+    return nan
+
+
+# Extract salary information
+def extract_salary(description):
+    if description != nan:
+        description = description.lower()
+        match = SALARY.search(description)
+        if match:
+            return match.group()
+    return nan
+
+
+# Skills, job type and company size all come from one keyword scan per
+# description (see keywords.py); these helpers turn the hits into labels
+def skills_from_hits(hits):
+    skills = all_matches(hits, 'skills')
+    return ', '.join(skills) if skills else nan
+
+
+def job_type_from_hits(hits):
+    return first_match(hits, 'job_type', 'Not Specified')
+
+
+def company_size_from_hits(hits):
+    return first_match(hits, 'company_size', 'Unknown')
+
+
+# Extract common skills
+def extract_skills(description):
+    if description != nan:
+        return skills_from_hits(scan_keywords(description.lower(), ('skills',)))
+    return nan
+
+
+# Extract job type
+def extract_job_type(description):
+    if is_missing(description):
+        return 'Not Specified'
+    return job_type_from_hits(scan_keywords(description.lower(), ('job_type',)))
+
+
+# Extract company size
+def extract_company_size(description):
+    if is_missing(description):
+        return 'Unknown'
+    return company_size_from_hits(scan_keywords(description.lower(), ('company_size',)))
+
+
+def remove_stopwords(description):
+    """Remove stopwords from a description"""
+    for chars in spec_char:
+        description = description.replace(chars, '')
+    return description
+
+
+def extract_keyword_fields(description):
+    """Skills, job type and company size from one keyword scan of an already lowercased description"""
+    hits = scan_keywords(description, KEYWORD_FIELD_GROUPS)
+    return skills_from_hits(hits), job_type_from_hits(hits), company_size_from_hits(hits)
+
+
+def extract_fields(description):
+    """Run every per-row extractor on one cleaned description
+
+    The description is lowercased once. Experience is read before the
+    stopwords are removed and everything else after, as the column-by-column
+    version of the script did; degrees go straight to their labels through
+    lookup tables.
+    """
+    description = description.lower()
+    experience, years = match_experience(description)
+    description = remove_stopwords(description)
+    return (experience, years, description, *match_degree_and_salary(description),
+            *extract_keyword_fields(description))
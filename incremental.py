@@ -0,0 +1,225 @@
+# Incremental processing of new postings against a persisted state store
+#
+#   python incremental.py --input postings_2020-11-08.xlsx --output data_jobs.parquet
+import argparse
+import json
+import os
+import shutil
+import time
+
+import numpy as np
+import pandas as pd
+
+from storage import write_table
+from text_processing import (OUTPUT_FILE, INTERMEDIATE_COLUMNS, RunningMoments, impute_by_level, level_aggregates,
+                             load_postings, merge_aggregates, print_summary, process_chunk, processing_fingerprint,
+                             summary_counts)
+
+STATE_DIR = '.incremental_state'
+
+# Columns identifying a posting; a posting whose other columns change is reprocessed.
+# Rows of one batch sharing these columns are kept together as one posting's rows.
+KEY_COLUMNS = ['position', 'company', 'location', 'date']
+
+# Posting key kept on the stored rows, not exported
+KEY_COLUMN = 'posting_key'
+
+
+def row_hashes(df, columns):
+    """64-bit hash of each row over the given columns"""
+    return pd.util.hash_pandas_object(df[list(columns)], index=False).to_numpy()
+
+
+def group_hashes(keys, hashes):
+    """Content hash of each row's key: its own hash, or that of every row sharing the key, in order"""
+    hashes = hashes.copy()
+    shared = pd.Series(keys).duplicated(keep=False).to_numpy()
+    if shared.any():
+        combined = pd.Series(hashes[shared]).groupby(keys[shared], sort=False).agg(
+            lambda values: hash(tuple(values)) & 0xFFFFFFFFFFFFFFFF)
+        hashes[shared] = combined.reindex(keys[shared]).to_numpy(dtype=np.uint64)
+    return hashes
+
+
+class WordCounts:
+    """Takes the place of RunningMoments in process_chunk to keep each posting's word count"""
+
+    def __init__(self):
+        self.values = []
+
+    def update(self, values):
+        self.values.append(values)
+
+
+class StateStore:
+    """Processed postings plus the global statistics their imputation depends on
+
+    The store keeps the processed rows before imputation, a key and content
+    hash per input row (with its word count; rows of a batch sharing a key
+    share the content hash of all of them), the per-level sums and counts of
+    experience and degree, and the word-count moments. A batch only runs
+    through processing for postings that are new or whose content changed;
+    the aggregates are adjusted for those rows and every stored row is then
+    imputed from the merged means, as a full run over all postings would.
+    """
+
+    FILES = ('postings.pkl', 'hashes.pkl', 'state.json')
+
+    def __init__(self, path=STATE_DIR, key_columns=KEY_COLUMNS):
+        self.path = path
+        self.key_columns = list(key_columns)
+        self.code = processing_fingerprint()
+        self.postings = None
+        self.hashes = pd.DataFrame({'content_hash': np.array([], dtype=np.uint64),
+                                    'word_count': np.array([], dtype=float)},
+                                   index=pd.Index(np.array([], dtype=np.uint64), name=KEY_COLUMN))
+        self.aggregates = None
+        self.moments = RunningMoments()
+
+    @classmethod
+    def open(cls, path=STATE_DIR, key_columns=KEY_COLUMNS):
+        """Load the store saved in path, or start an empty one"""
+        store = cls(path, key_columns)
+        state_file = os.path.join(path, 'state.json')
+        if not os.path.exists(state_file):
+            return store
+
+        with open(state_file, encoding='utf-8') as f:
+            state = json.load(f)
+        if state['code'] != store.code or state['key_columns'] != store.key_columns:
+            raise ValueError(f'The state in {path} was built by different processing code or key columns; '
+                             'rebuild it from the full input with --rebuild')
+
+        store.postings = pd.read_pickle(os.path.join(path, 'postings.pkl'))
+        store.hashes = pd.read_pickle(os.path.join(path, 'hashes.pkl'))
+        if state['aggregates'] is not None:
+            store.aggregates = pd.DataFrame.from_dict(state['aggregates'], orient='index')
+            store.aggregates.index.name = 'level'
+        store.moments.count, store.moments.total, store.moments.total_sq = state['moments']
+        return store
+
+    def save(self):
+        """Write the store atomically, file by file"""
+        os.makedirs(self.path, exist_ok=True)
+        state = {
+            'code': self.code,
+            'key_columns': self.key_columns,
+            'aggregates': None if self.aggregates is None else self.aggregates.to_dict(orient='index'),
+            'moments': [self.moments.count, self.moments.total, self.moments.total_sq],
+        }
+        for name in self.FILES:
+            path = os.path.join(self.path, name)
+            if name == 'state.json':
+                with open(path + '.tmp', 'w', encoding='utf-8') as f:
+                    json.dump(state, f, default=float)
+            elif name == 'postings.pkl':
+                (self.postings if self.postings is not None else pd.DataFrame()).to_pickle(path + '.tmp')
+            else:
+                self.hashes.to_pickle(path + '.tmp')
+            os.replace(path + '.tmp', path)
+
+    def __len__(self):
+        return 0 if self.postings is None else len(self.postings)
+
+    def update(self, batch, workers=1):
+        """Process the new and changed postings of batch and fold them into the store
+
+        Returns how many postings of the batch were new, changed and unchanged.
+        """
+        batch = batch.reset_index(drop=True)
+        keys = row_hashes(batch, self.key_columns)
+
+        # Rows sharing a key are all kept, as a full run keeps them, and are compared and replaced together
+        hashes = group_hashes(keys, row_hashes(batch, sorted(batch.columns)))
+        first = ~pd.Series(keys).duplicated().to_numpy()
+
+        stored = self.hashes[~self.hashes.index.duplicated()]
+        positions = stored.index.get_indexer(keys[first])
+        seen = positions >= 0
+        unchanged = np.zeros(len(positions), dtype=bool)
+        unchanged[seen] = stored['content_hash'].to_numpy()[positions[seen]] == hashes[first][seen]
+        changed = seen & ~unchanged
+
+        self._forget(keys[first][changed])
+        todo = np.isin(keys, keys[first][~unchanged])
+        if todo.any():
+            self._add(batch[todo].reset_index(drop=True), keys[todo], hashes[todo], workers)
+
+        return {'new': int((~seen).sum()), 'changed': int(changed.sum()), 'unchanged': int(unchanged.sum())}
+
+    def _forget(self, keys):
+        """Take the stored versions of these postings out of the rows and statistics"""
+        if not len(keys):
+            return
+        gone = self.hashes.index.isin(keys)
+        self.moments.remove(self.hashes.loc[gone, 'word_count'].dropna())
+        self.hashes = self.hashes[~gone]
+
+        if self.postings is not None:
+            gone = self.postings[KEY_COLUMN].isin(keys)
+            self.aggregates = merge_aggregates(self.aggregates, -level_aggregates(self.postings[gone]))
+            self.postings = self.postings[~gone].reset_index(drop=True)
+
+    def _add(self, batch, keys, hashes, workers):
+        """Process postings and add them to the rows and statistics"""
+        word_counts = WordCounts()
+        rows = process_chunk(batch.assign(**{KEY_COLUMN: keys}), word_counts, workers=workers)
+
+        # Postings dropped before the word count (no industry) have none
+        counts = pd.Series(np.nan, index=batch.index)
+        for values in word_counts.values:
+            counts[values.index] = values.to_numpy()
+        self.moments.update(counts.dropna())
+
+        added = pd.DataFrame({'content_hash': hashes, 'word_count': counts.to_numpy()},
+                             index=pd.Index(keys, name=KEY_COLUMN))
+        self.hashes = pd.concat([self.hashes, added]) if len(self.hashes) else added
+
+        if len(rows):
+            self.aggregates = merge_aggregates(self.aggregates, level_aggregates(rows))
+            self.postings = rows if self.postings is None else pd.concat([self.postings, rows], ignore_index=True)
+
+    def output(self):
+        """Every stored posting, imputed from the merged per-level means"""
+        df = impute_by_level(self.postings.copy(), self.aggregates)
+        return df.drop(columns=KEY_COLUMN)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Process new or changed LinkedIn job posts into an existing output')
+    parser.add_argument('--input', required=True, help='Excel, CSV, Parquet or Arrow file with a batch of posts')
+    parser.add_argument('--output', default=OUTPUT_FILE, help='Parquet, Arrow or CSV file rewritten with every post')
+    parser.add_argument('--state-dir', default=STATE_DIR, help='directory holding the processed posts and statistics')
+    parser.add_argument('--rebuild', action='store_true', help='discard the stored state before processing')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='processes used by the extractors (1 = serial, 0 = one per CPU core)')
+    parser.add_argument('--quiet', action='store_true', help='do not print the data summary')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    if args.rebuild and os.path.isdir(args.state_dir):
+        shutil.rmtree(args.state_dir)
+    store = StateStore.open(args.state_dir)
+
+    changes = store.update(load_postings(args.input), workers=args.workers)
+    print(f"{changes['new']:,} new, {changes['changed']:,} changed and "
+          f"{changes['unchanged']:,} unchanged posts in '{args.input}'")
+    if not len(store):
+        print('No processed posts to write')
+        return
+
+    df = store.output()
+    print('Mean word count per post:', round(store.moments.mean))
+    print('std word count per post:', round(store.moments.std))
+    if not args.quiet:
+        print_summary(summary_counts(df), df.columns)
+
+    #drop unneeded columns
+    df = df.drop(columns=INTERMEDIATE_COLUMNS)
+    write_table(df, args.output)
+    store.save()
+    print(f"\n{len(df):,} posts saved to '{args.output}' in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == '__main__':
+    main()
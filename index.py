@@ -0,0 +1,294 @@
+# Inverted index and boolean queries over the processed postings
+#
+#   python index.py data_jobs.index "python AND Riyadh AND year_of_ex>=3"
+import argparse
+import json
+import os
+import re
+import time
+from collections import defaultdict
+
+import numpy as np
+import pandas as pd
+
+from compact import BITMASK_COLUMNS, decode_bitmask, expand_frame, stored_labels
+from extraction import remove_stopwords
+from normalizer import normalize_text
+from storage import read_table, table_format, _require_pyarrow
+
+# Label fields indexed by their value, and the numeric field indexed by bucket
+LABEL_FIELDS = ['skills', 'Regions', 'industry_cat', 'job_type']
+NUMERIC_FIELDS = ['year_of_ex']
+TEXT_FIELD = 'description'
+
+# Other names accepted for the fields in queries
+FIELD_ALIASES = {'skill': 'skills', 'region': 'Regions', 'regions': 'Regions', 'industry': 'industry_cat',
+                 'type': 'job_type', 'experience': 'year_of_ex', 'text': 'description'}
+
+CLAUSE = re.compile(r'(?P<field>\w+)\s*(?P<op>>=|<=|==|=|>|<|:)\s*(?P<value>.+)')
+AND = re.compile(r'\s+AND\s+', re.IGNORECASE)
+
+
+def description_words(text):
+    """Words of text as they appear in the exported description
+
+    The description is normalized, lowercased and stripped of the stopword
+    substrings of extraction.remove_stopwords ('data' is stored as 'dt'),
+    so query words go through the same functions to match it.
+    """
+    return remove_stopwords(normalize_text(text).lower()).split()
+
+
+def field_terms(df, field):
+    """The (row position, term) pairs of one field, one pair per distinct term in a row"""
+    values = df[field].reset_index(drop=True)
+    if field in BITMASK_COLUMNS and pd.api.types.is_integer_dtype(values):
+        values = decode_bitmask(values, stored_labels(df, field))
+    values = values.astype(object)
+
+    if field == 'skills':
+        values = values.str.split(', ').explode()
+    elif field == TEXT_FIELD:
+        values = values.str.split().explode()
+    elif field in NUMERIC_FIELDS:
+        values = values.dropna().astype(int).astype(str)
+    values = values.dropna()
+    pairs = pd.DataFrame({'row': values.index, 'term': values.to_numpy()}).drop_duplicates()
+    return pairs['row'].to_numpy(), pairs['term'].to_numpy()
+
+
+class IndexBuilder:
+    """Collect posting lists chunk by chunk and save them as an index directory
+
+    Posting IDs are row positions in the output table, so chunks must be
+    added in the order they are written.
+    """
+
+    def __init__(self, text=True):
+        self.fields = LABEL_FIELDS + NUMERIC_FIELDS + ([TEXT_FIELD] if text else [])
+        self.rows = 0
+        self._postings = {}
+
+    def add(self, df):
+        for field in self.fields:
+            if field not in df.columns:
+                continue
+            rows, terms = field_terms(df, field)
+            if not len(rows):
+                continue
+            postings = self._postings.setdefault(field, defaultdict(list))
+            codes, uniques = pd.factorize(terms)
+            order = np.argsort(codes, kind='stable')
+            ids = (rows[order] + self.rows).astype(np.uint32)
+            for term, term_ids in zip(uniques, np.split(ids, np.cumsum(np.bincount(codes))[:-1])):
+                postings[term].append(term_ids)
+        self.rows += len(df)
+
+    def save(self, path, table_path=None):
+        """Write every posting list into one uint32 array, with a term table per field"""
+        os.makedirs(path, exist_ok=True)
+        arrays = []
+        offset = 0
+        for field, postings in self._postings.items():
+            terms = {}
+            for term in sorted(postings):
+                ids = np.concatenate(postings[term])
+                terms[term] = [offset, len(ids)]
+                arrays.append(ids)
+                offset += len(ids)
+            with open(os.path.join(path, f'terms-{field}.json'), 'w', encoding='utf-8') as f:
+                json.dump(terms, f, ensure_ascii=False)
+
+        np.save(os.path.join(path, 'postings.npy'),
+                np.concatenate(arrays) if arrays else np.array([], dtype=np.uint32))
+        meta = {'rows': self.rows, 'fields': list(self._postings), 'table': table_path and os.path.abspath(table_path)}
+        with open(os.path.join(path, 'meta.json'), 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+
+
+def build_index(df, path, table_path=None, text=True):
+    """Index a processed table whose rows are in output order"""
+    builder = IndexBuilder(text)
+    builder.add(df)
+    builder.save(path, table_path)
+    return builder
+
+
+class PostingIndex:
+    """Read side of an index directory
+
+    The posting lists are memory-mapped and each field's term table is
+    loaded the first time the field is queried, so a query reads only the
+    lists it needs. Queries are clauses joined by AND:
+
+        python                  a label of any label field, else a description word
+        Regions:Riyadh          a value of one field (description:word for words)
+        year_of_ex>=3           a comparison on a numeric field (>=, <=, >, <, =)
+        NOT job_type:Contract   postings without the term
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, 'meta.json'), encoding='utf-8') as f:
+            self.meta = json.load(f)
+        self.rows = self.meta['rows']
+        self.fields = self.meta['fields']
+        self._postings = np.load(os.path.join(path, 'postings.npy'), mmap_mode='r')
+        self._terms = {}
+
+    def terms(self, field):
+        if field not in self._terms:
+            if field not in self.fields:
+                raise KeyError(f'{field} is not indexed; indexed fields: {self.fields}')
+            with open(os.path.join(self.path, f'terms-{field}.json'), encoding='utf-8') as f:
+                self._terms[field] = json.load(f)
+        return self._terms[field]
+
+    def postings(self, field, term):
+        """Sorted row IDs holding term in field"""
+        start, count = self.terms(field).get(term, (0, 0))
+        return np.asarray(self._postings[start:start + count])
+
+    def _field(self, name):
+        name = FIELD_ALIASES.get(name.lower(), name)
+        for field in self.fields:
+            if field.lower() == name.lower():
+                return field
+        raise KeyError(f'{name} is not indexed; indexed fields: {self.fields}')
+
+    def _label(self, field, value):
+        """Term of field matching value, ignoring case"""
+        terms = self.terms(field)
+        if value in terms:
+            return value
+        return next((term for term in terms if term.lower() == value.lower()), None)
+
+    def _words(self, value):
+        """Rows whose description holds every word of value, none if value has no word left to look up"""
+        words = description_words(value)
+        ids = [self.postings(TEXT_FIELD, word) for word in words]
+        return intersect(ids) if ids else np.array([], dtype=np.uint32)
+
+    def _clause(self, clause):
+        match = CLAUSE.fullmatch(clause)
+        if match is None:
+            # A bare term: labels of every label field, else description words
+            found = [self.postings(field, term) for field in self.fields if field in LABEL_FIELDS
+                     for term in [self._label(field, clause)] if term is not None]
+            if found:
+                return np.unique(np.concatenate(found))
+            if TEXT_FIELD in self.fields:
+                return self._words(clause)
+            return np.array([], dtype=np.uint32)
+
+        field, op, value = self._field(match['field']), match['op'], match['value'].strip().strip('"\'')
+        if field == TEXT_FIELD:
+            return self._words(value)
+        if op == ':' or (op in ('=', '==') and field not in NUMERIC_FIELDS):
+            term = self._label(field, value)
+            return self.postings(field, term) if term is not None else np.array([], dtype=np.uint32)
+
+        if field not in NUMERIC_FIELDS:
+            raise ValueError(f'{field} is not numeric; use {field}:value')
+        try:
+            bound = float(value)
+        except ValueError:
+            raise ValueError(f'{field}{op} needs a number, not {value!r}') from None
+        compare = {'>=': np.greater_equal, '<=': np.less_equal, '>': np.greater, '<': np.less,
+                   '=': np.equal, '==': np.equal}[op]
+        ids = [self.postings(field, term) for term in self.terms(field) if compare(float(term), bound)]
+        return np.sort(np.concatenate(ids)) if ids else np.array([], dtype=np.uint32)
+
+    def query(self, text):
+        """Sorted row IDs matching every clause of a query"""
+        include, exclude = [], []
+        for clause in AND.split(text.strip()):
+            if clause[:4].upper() == 'NOT ':
+                exclude.append(self._clause(clause[4:].strip()))
+            else:
+                include.append(self._clause(clause.strip()))
+        ids = intersect(include) if include else np.arange(self.rows, dtype=np.uint32)
+        for other in exclude:
+            ids = np.setdiff1d(ids, other, assume_unique=True)
+        return ids
+
+    def fetch(self, ids, columns=None):
+        """Rows of the indexed table by ID
+
+        Parquet tables are read one row group at a time, only the groups
+        holding the rows; Arrow tables are memory-mapped and the rows taken
+        from the mapping. CSV tables are read whole.
+        """
+        table_path = self.meta['table']
+        if not table_path:
+            raise ValueError('The index was built without a table path')
+        ids = np.asarray(ids, dtype=np.int64)
+        fmt = table_format(table_path)
+        if fmt == 'parquet':
+            df = read_parquet_rows(table_path, ids, columns)
+        elif fmt == 'arrow':
+            _require_pyarrow()
+            import pyarrow.feather as feather
+            table = feather.read_table(table_path, columns=columns, memory_map=True)
+            df = table.take(ids).to_pandas()
+        else:
+            df = read_table(table_path, columns=columns).iloc[ids]
+        df.index = ids
+        return expand_frame(df)
+
+
+def read_parquet_rows(path, ids, columns=None):
+    """Rows of a Parquet file by position, reading only the row groups that hold them"""
+    _require_pyarrow()
+    import pyarrow.parquet as pq
+    parquet = pq.ParquetFile(path, memory_map=True)
+    sizes = np.array([parquet.metadata.row_group(i).num_rows for i in range(parquet.num_row_groups)], dtype=np.int64)
+    starts = np.concatenate([[0], np.cumsum(sizes)])
+    if len(ids) and (ids.min() < 0 or ids.max() >= starts[-1]):
+        raise IndexError(f'Row IDs must be below {starts[-1]:,}, the rows of {path}')
+
+    group_of = np.searchsorted(starts, ids, side='right') - 1
+    groups = np.unique(group_of)
+    table = parquet.read_row_groups(groups.tolist(), columns=columns)
+
+    # Position of each row in the concatenation of the groups read
+    offsets = np.concatenate([[0], np.cumsum(sizes[groups])[:-1]])
+    positions = ids - starts[group_of] + offsets[np.searchsorted(groups, group_of)]
+    return table.take(positions).to_pandas()
+
+
+def intersect(id_lists):
+    """Intersection of sorted ID arrays, smallest first"""
+    id_lists = sorted(id_lists, key=len)
+    ids = id_lists[0]
+    for other in id_lists[1:]:
+        if not len(ids):
+            break
+        ids = np.intersect1d(ids, other, assume_unique=True)
+    return ids
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Query the inverted index of the processed LinkedIn job posts')
+    parser.add_argument('index', help='index directory written by text_processing.py --index')
+    parser.add_argument('query', help='e.g. "python AND Riyadh AND year_of_ex>=3"')
+    parser.add_argument('--show', type=int, default=10, help='print this many matching posts')
+    parser.add_argument('--columns', default='position,company,Regions,industry_cat,year_of_ex,skills')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    index = PostingIndex(args.index)
+    try:
+        ids = index.query(args.query)
+    except (KeyError, ValueError) as e:
+        parser.error(e.args[0])
+    elapsed = time.perf_counter() - start
+    print(f'{len(ids):,} of {index.rows:,} posts match ({elapsed * 1000:.1f} ms)')
+
+    if args.show and len(ids) and index.meta['table']:
+        pd.options.display.width = 200
+        print(index.fetch(ids[:args.show], args.columns.split(',')))
+
+
+if __name__ == '__main__':
+    main()
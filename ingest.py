@@ -0,0 +1,330 @@
+# Asyncio ingestion: postings are cleaned, tagged and written within seconds of arriving
+#
+#   python ingest.py --listen 127.0.0.1:8765 --output live.ndjson
+#   python ingest.py --replay postings.xlsx --to 127.0.0.1:8765 --rate 200
+#   python ingest.py --replay postings.xlsx --output live.ndjson
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import signal
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+import pandas as pd
+
+from data_enhancements import enhance_dataset
+from parallel import resolve_workers
+from rollup import Rollup, rollup_counts
+from storage import read_chunks
+from text_processing import (INTERMEDIATE_COLUMNS, RunningMoments, impute_by_level, level_aggregates,
+                             merge_aggregates, process_chunk)
+
+DEFAULT_BATCH_SIZE = 500
+DEFAULT_BATCH_TIMEOUT = 1.0
+DEFAULT_QUEUE_SIZE = 10_000
+
+# Put on the queue to flush the last batch and stop
+STOP = object()
+
+
+def clean_batch(records):
+    """Clean and extract one micro-batch of raw postings
+
+    Runs in an executor process. Returns the rows kept after the corrupt-row
+    filter (None if there are none) and their level aggregates.
+    """
+    df = pd.DataFrame(records)
+    df['date'] = pd.to_datetime(df['date'])
+    with contextlib.redirect_stdout(io.StringIO()):
+        df = process_chunk(df, RunningMoments())
+    if df.empty:
+        return None, None
+    return df, level_aggregates(df)
+
+
+def enrich_batch(df, aggregates):
+    """Impute and enhance a cleaned batch
+
+    Runs in an executor process, in arrival order: missing experience and
+    degree are imputed from the level means of the batches written before
+    plus this one (aggregates). Returns the enriched rows as NDJSON and the
+    batch's rollup cells (see rollup.py).
+    """
+    with contextlib.redirect_stdout(io.StringIO()):
+        df = impute_by_level(df, aggregates)
+        df = enhance_dataset(df.drop(columns=INTERMEDIATE_COLUMNS))
+    text = df.to_json(orient='records', lines=True, date_format='iso')
+    return text if text.endswith('\n') else text + '\n', rollup_counts(df)
+
+
+class NdjsonSink:
+    """Appends enriched rows to an NDJSON file (or stdout for '-'), flushed per batch"""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = sys.stdout if path == '-' else open(path, 'a', encoding='utf-8')
+
+    def write(self, text):
+        self._file.write(text)
+        self._file.flush()
+
+    def close(self):
+        if self._file is not sys.stdout:
+            self._file.close()
+
+
+class Ingestor:
+    """Micro-batches queued postings and runs each batch through clean_batch and enrich_batch on a process pool
+
+    Backpressure comes from bounded queues: submit() waits while the input
+    queue is full, batches are only taken off it while fewer than workers
+    are in flight, and finished batches wait for the (ordered) writer, so a
+    slow sink or pool slows the producers down instead of growing memory.
+    With rollup_path, the rollup there is updated with every written batch.
+
+    Batches are cleaned concurrently but imputed and written one at a time
+    in arrival order, so the level means a batch is imputed from do not
+    depend on which other batches happen to finish first. A batch that
+    fails is logged, counted and appended to dead_letter (a sink for the
+    raw postings) if given; the batches after it carry on.
+    """
+
+    def __init__(self, sink, batch_size=DEFAULT_BATCH_SIZE, batch_timeout=DEFAULT_BATCH_TIMEOUT, workers=1,
+                 queue_size=DEFAULT_QUEUE_SIZE, rollup_path=None, dead_letter=None):
+        self.sink = sink
+        self.dead_letter = dead_letter
+        self.batch_size = batch_size
+        self.batch_timeout = batch_timeout
+        self.workers = resolve_workers(workers)
+        self.queue = asyncio.Queue(queue_size)
+        self.aggregates = None
+        self.rollup_path = rollup_path
+        self.rollup = None
+        if rollup_path:
+            self.rollup = Rollup.load(rollup_path) if os.path.exists(rollup_path) else Rollup()
+        self.stats = {'received': 0, 'batches': 0, 'written': 0, 'dropped': 0, 'failed': 0, 'max_latency': 0.0}
+
+    async def submit(self, record):
+        """Queue one raw posting (a dict of the input columns), waiting while the queue is full"""
+        await self.queue.put((time.monotonic(), record))
+        self.stats['received'] += 1
+
+    async def close(self):
+        """Flush what is queued and stop run()"""
+        await self.queue.put(STOP)
+
+    async def batches(self):
+        """Lists of (arrival time, record), cut at batch_size postings or batch_timeout seconds
+
+        One get() is kept pending across timeouts; cancelling a get() that
+        asyncio.wait_for timed out could lose the posting it just took.
+        """
+        loop = asyncio.get_running_loop()
+        getter = None
+        batch, deadline = [], None
+        try:
+            while True:
+                getter = getter or asyncio.ensure_future(self.queue.get())
+                timeout = max(deadline - loop.time(), 0) if batch else None
+                done, _ = await asyncio.wait({getter}, timeout=timeout)
+                if not done:
+                    yield batch
+                    batch = []
+                    continue
+                item, getter = getter.result(), None
+                if item is STOP:
+                    if batch:
+                        yield batch
+                    return
+                if not batch:
+                    deadline = loop.time() + self.batch_timeout
+                batch.append(item)
+                if len(batch) >= self.batch_size:
+                    yield batch
+                    batch = []
+        finally:
+            if getter is not None:
+                getter.cancel()
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        pending = asyncio.Queue(self.workers)
+        with ProcessPoolExecutor(self.workers, mp_context=get_context()) as executor:
+            writer = asyncio.create_task(self._write(pending, executor))
+            try:
+                async for batch in self.batches():
+                    records = [record for _, record in batch]
+                    future = loop.run_in_executor(executor, clean_batch, records)
+                    await self._put(pending, (batch[0][0], records, future), writer)
+                await self._put(pending, None, writer)
+                await writer
+            finally:
+                writer.cancel()
+
+    @staticmethod
+    async def _put(pending, item, writer):
+        """Queue item for the writer, raising the writer's error if it stopped instead of waiting forever"""
+        put = asyncio.ensure_future(pending.put(item))
+        await asyncio.wait({put, writer}, return_when=asyncio.FIRST_COMPLETED)
+        if not put.done():
+            put.cancel()
+            writer.result()
+            raise RuntimeError('The writer stopped before the last batch')
+
+    async def _write(self, pending, executor):
+        """Impute, enhance and write finished batches in arrival order"""
+        loop = asyncio.get_running_loop()
+        while True:
+            item = await pending.get()
+            if item is None:
+                return
+            arrived, records, future = item
+            kept = 0
+            try:
+                df, batch_aggregates = await future
+                if df is not None:
+                    aggregates = merge_aggregates(self.aggregates, batch_aggregates)
+                    text, cells = await loop.run_in_executor(executor, enrich_batch, df, aggregates)
+                    await asyncio.to_thread(self.sink.write, text)
+                    kept = len(df)
+                    self.aggregates = aggregates
+                    if self.rollup is not None:
+                        self.rollup.merge(cells)
+                        await asyncio.to_thread(self.rollup.save, self.rollup_path)
+            except Exception as e:
+                await self._fail(records, e)
+            else:
+                self.stats['written'] += kept
+                self.stats['dropped'] += len(records) - kept
+            self.stats['batches'] += 1
+            self.stats['max_latency'] = max(self.stats['max_latency'], time.monotonic() - arrived)
+
+    async def _fail(self, records, error):
+        """Log a failed batch and set its raw postings aside"""
+        self.stats['failed'] += len(records)
+        print(f"Batch of {len(records):,} posts failed: {type(error).__name__}: {error}", file=sys.stderr)
+        if self.dead_letter is not None:
+            text = ''.join(json.dumps(record, default=str) + '\n' for record in records)
+            await asyncio.to_thread(self.dead_letter.write, text)
+
+    def print_stats(self):
+        stats = self.stats
+        print('\n=== INGESTION ===')
+        print(f"{stats['received']:,} posts received in {stats['batches']:,} batches; "
+              f"{stats['written']:,} written, {stats['dropped']:,} dropped as corrupt, "
+              f"{stats['failed']:,} in failed batches")
+        print(f"Slowest batch: {stats['max_latency']:.2f}s from first arrival to written")
+        if self.rollup is not None:
+            print(f"Rollup of {self.rollup.posts:,} posts in '{self.rollup_path}'")
+
+
+async def handle_connection(ingestor, reader, writer):
+    """Queue every line of a connection as one JSON posting"""
+    try:
+        while line := await reader.readline():
+            if line.strip():
+                await ingestor.submit(json.loads(line))
+    finally:
+        writer.close()
+
+
+async def serve(ingestor, host, port, stop):
+    """Accept NDJSON postings over TCP until stop is set"""
+    server = await asyncio.start_server(lambda r, w: handle_connection(ingestor, r, w), host, port)
+    async with server:
+        print(f"Listening on {host}:{port}")
+        await stop.wait()
+
+
+async def replay_postings(path, rate=0, chunksize=1000):
+    """Stand-in producer: the rows of a table as raw posting dicts, rate per second (0 = unthrottled)"""
+    chunks = read_chunks(path, chunksize)
+    start = time.monotonic()
+    sent = 0
+    while (chunk := await asyncio.to_thread(next, chunks, None)) is not None:
+        for record in json.loads(chunk.to_json(orient='records', date_format='iso')):
+            yield record
+            sent += 1
+            if rate:
+                await asyncio.sleep(max(start + sent / rate - time.monotonic(), 0))
+
+
+async def send_postings(path, host, port, rate=0):
+    """Replay a table to a listening ingestor"""
+    reader, writer = await asyncio.open_connection(host, port)
+    sent = 0
+    async for record in replay_postings(path, rate):
+        writer.write(json.dumps(record).encode() + b'\n')
+        # drain waits while the ingestor is not reading, passing its backpressure on
+        await writer.drain()
+        sent += 1
+    writer.close()
+    await writer.wait_closed()
+    print(f"{sent:,} posts sent to {host}:{port}")
+
+
+async def ingest(args):
+    if args.to:
+        host, port = args.to.rsplit(':', 1)
+        await send_postings(args.replay, host, int(port), args.rate)
+        return
+
+    sink = NdjsonSink(args.output)
+    dead_letter = NdjsonSink(args.dead_letter) if args.dead_letter else None
+    ingestor = Ingestor(sink, args.batch_size, args.batch_timeout, args.workers, args.queue_size,
+                        args.rollup, dead_letter)
+    runner = asyncio.create_task(ingestor.run())
+    try:
+        if args.replay:
+            async for record in replay_postings(args.replay, args.rate):
+                await ingestor.submit(record)
+        else:
+            stop = asyncio.Event()
+            for sig in (signal.SIGINT, signal.SIGTERM):
+                asyncio.get_running_loop().add_signal_handler(sig, stop.set)
+            host, port = args.listen.rsplit(':', 1)
+            await serve(ingestor, host, int(port), stop)
+        await ingestor.close()
+        await runner
+    finally:
+        runner.cancel()
+        sink.close()
+        if dead_letter is not None:
+            dead_letter.close()
+    ingestor.print_stats()
+    if args.output != '-':
+        print(f"Enriched posts appended to '{args.output}'")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Clean and tag LinkedIn job posts as they arrive')
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--listen', metavar='HOST:PORT', help='accept NDJSON posts over TCP')
+    source.add_argument('--replay', metavar='PATH', help='feed the rows of an Excel, CSV, Parquet or Arrow file')
+    parser.add_argument('--to', metavar='HOST:PORT', help='with --replay, send the rows to a listening ingestor')
+    parser.add_argument('--rate', type=float, default=0, help='with --replay, posts per second (0 = unthrottled)')
+    parser.add_argument('--output', default='live.ndjson', help="NDJSON file the enriched posts are appended to, '-' for stdout")
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE, help='posts per batch at most')
+    parser.add_argument('--batch-timeout', type=float, default=DEFAULT_BATCH_TIMEOUT,
+                        help='seconds a batch waits for more posts after its first one')
+    parser.add_argument('--workers', type=int, default=1, help='batches processed at once (0 = one per CPU core)')
+    parser.add_argument('--queue-size', type=int, default=DEFAULT_QUEUE_SIZE,
+                        help='posts queued before producers have to wait')
+    parser.add_argument('--rollup', metavar='PATH',
+                        help='keep the rollup of market statistics here up to date with every batch (see rollup.py)')
+    parser.add_argument('--dead-letter', metavar='PATH',
+                        help='append the raw posts of batches that fail here, as NDJSON')
+    args = parser.parse_args()
+    if args.to and not args.replay:
+        parser.error('--to needs --replay')
+
+    asyncio.run(ingest(args))
+
+
+if __name__ == '__main__':
+    main()
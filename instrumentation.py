@@ -0,0 +1,210 @@
+# Per-step timing, memory and row-count instrumentation for the pipeline
+import cProfile
+import functools
+import json
+import os
+import sys
+import time
+import tracemalloc
+from collections import OrderedDict
+from contextlib import contextmanager, nullcontext
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def row_count(data):
+    """Rows of a DataFrame, Series or list; None for anything else (e.g. an input path)"""
+    if isinstance(data, (str, bytes, os.PathLike)) or data is None:
+        return None
+    try:
+        return len(data)
+    except TypeError:
+        return None
+
+
+def current_rss_mb():
+    """Resident set size of this process, where /proc is available"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2 ** 20
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def max_rss_mb():
+    """Peak resident set size of this process so far"""
+    if resource is None:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return usage / 2 ** 20 if sys.platform == 'darwin' else usage / 2 ** 10
+
+
+class Step:
+    """A running step; output() records the rows of its result"""
+
+    def __init__(self, name, path, data):
+        self.name = name
+        self.path = path
+        self.rows_in = row_count(data)
+        self.rows_out = None
+        self.peak = 0
+
+    def output(self, data):
+        self.rows_out = row_count(data)
+        return data
+
+
+class NullStep:
+    """Stands in for Step while instrumentation is disabled"""
+
+    def output(self, data):
+        return data
+
+
+class Instrumentation:
+    """Wall time, CPU time, memory and rows in/out of named pipeline steps
+
+    Steps nest, and each record carries its path (e.g. extract/extract_features/extract_fields).
+    Memory is the process RSS after the step and its peak so far; with
+    trace_memory, also the peak Python allocations during the step
+    (tracemalloc, which slows the run down). CPU time is this process only,
+    so work done in pool workers shows up as wall time.
+
+    Records stream to an NDJSON file (.ndjson/.jsonl) as steps finish, or
+    are written as one JSON document on close. profile_step runs cProfile
+    around every step with that name or path and dumps the stats on close.
+
+    Disabled until enable() is called, when a step costs one attribute check.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.records = []
+        self._stack = []
+
+    def enable(self, report_path=None, trace_memory=False, profile_step=None, profile_path=None):
+        self.enabled = True
+        self.records = []
+        self.report_path = report_path
+        self.trace_memory = trace_memory
+        self.profile_step = profile_step
+        self.profile_path = profile_path or f'{profile_step}.prof'
+        self._profiler = cProfile.Profile() if profile_step else None
+        self._profiling = 0
+        self._started = time.perf_counter()
+        self._stream = None
+        if report_path and report_path.endswith(('.ndjson', '.jsonl')):
+            self._stream = open(report_path, 'w', encoding='utf-8')
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        return self
+
+    def step(self, name, data=None):
+        """Context manager timing one step; data is its input, for the row count"""
+        if not self.enabled:
+            return nullcontext(NullStep())
+        return self._record(name, data)
+
+    @contextmanager
+    def _record(self, name, data):
+        path = '/'.join([parent.path for parent in self._stack[-1:]] + [name])
+        step = Step(name, path, data)
+
+        if self.trace_memory:
+            # The parent keeps the peak reached so far before it is reset for this step
+            if self._stack:
+                self._stack[-1].peak = max(self._stack[-1].peak, tracemalloc.get_traced_memory()[1])
+            start_traced = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+
+        profile = self._profiler is not None and self.profile_step in (name, path)
+        if profile:
+            if not self._profiling:
+                self._profiler.enable()
+            self._profiling += 1
+
+        self._stack.append(step)
+        start, cpu_start = time.perf_counter(), time.process_time()
+        try:
+            yield step
+        finally:
+            wall, cpu = time.perf_counter() - start, time.process_time() - cpu_start
+            self._stack.pop()
+            if profile:
+                self._profiling -= 1
+                if not self._profiling:
+                    self._profiler.disable()
+
+            record = OrderedDict([
+                ('step', path), ('name', name), ('depth', len(self._stack)),
+                ('start_s', round(start - self._started, 6)), ('wall_s', round(wall, 6)), ('cpu_s', round(cpu, 6)),
+                ('rows_in', step.rows_in), ('rows_out', step.rows_out),
+                ('rss_mb', _round(current_rss_mb())), ('max_rss_mb', _round(max_rss_mb())),
+            ])
+            if self.trace_memory:
+                peak = max(step.peak, tracemalloc.get_traced_memory()[1])
+                record['peak_alloc_mb'] = _round((peak - start_traced) / 2 ** 20)
+                if self._stack:
+                    self._stack[-1].peak = max(self._stack[-1].peak, peak)
+                tracemalloc.reset_peak()
+            self.records.append(record)
+            if self._stream is not None:
+                self._stream.write(json.dumps(record) + '\n')
+
+    def summary(self):
+        """Totals per step path, in the order the steps first finished"""
+        totals = OrderedDict()
+        for record in self.records:
+            total = totals.setdefault(record['step'], {'calls': 0, 'wall_s': 0.0, 'cpu_s': 0.0,
+                                                       'rows_in': 0, 'rows_out': 0})
+            total['calls'] += 1
+            total['wall_s'] += record['wall_s']
+            total['cpu_s'] += record['cpu_s']
+            total['rows_in'] += record['rows_in'] or 0
+            total['rows_out'] += record['rows_out'] or 0
+        return totals
+
+    def print_summary(self, top=25):
+        print('\n=== STEP TIMINGS ===')
+        totals = sorted(self.summary().items(), key=lambda item: item[1]['wall_s'], reverse=True)
+        for path, total in totals[:top]:
+            print(f"{path:<40} {total['wall_s']:9.3f}s wall {total['cpu_s']:9.3f}s cpu "
+                  f"{total['calls']:6,} calls  rows {total['rows_in']:,} -> {total['rows_out']:,}")
+
+    def close(self):
+        """Write the JSON report and the profile, then stop recording"""
+        if not self.enabled:
+            return
+        if self._stream is not None:
+            self._stream.close()
+        elif self.report_path:
+            with open(self.report_path, 'w', encoding='utf-8') as f:
+                json.dump({'steps': self.records, 'summary': self.summary()}, f, indent=2)
+        if self._profiler is not None:
+            self._profiler.dump_stats(self.profile_path)
+        if self.trace_memory:
+            tracemalloc.stop()
+        self.enabled = False
+
+
+def _round(value):
+    return None if value is None else round(value, 2)
+
+
+# Shared by every module, so one run produces one report
+instrumentation = Instrumentation()
+
+
+def instrumented(func):
+    """Record each call of a DataFrame -> DataFrame function as a step named after it"""
+    @functools.wraps(func)
+    def wrapper(df, *args, **kwargs):
+        if not instrumentation.enabled:
+            return func(df, *args, **kwargs)
+        with instrumentation.step(func.__name__, df) as step:
+            return step.output(func(df, *args, **kwargs))
+    return wrapper
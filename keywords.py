@@ -0,0 +1,52 @@
+# Multi-keyword matching shared by the LinkedIn Jobs extractors
+#
+# The vocabularies come from config/rules.json (see rules.py); editing that
+# file changes what both scripts extract, with no code change.
+from rules import FIRST_MATCH_GROUPS, build_automaton, load_rules
+
+# Compiled once (or read from the cache of the config's hash) and shared by every extractor
+compiled_rules = load_rules()
+
+# Every vocabulary, by the name of the extractor that consumes it; labels in priority order
+keyword_groups = compiled_rules.keyword_groups
+
+# Seniority read from the job level, in priority order
+seniority_keywords = compiled_rules.seniority
+
+# Industry categories of the industries column
+industry_pattern = compiled_rules.industry_pattern
+industry_aliases = compiled_rules.industry_aliases
+
+_automaton = compiled_rules.automaton
+
+# Matchers of the group subsets the extractors ask for, built on first use
+_matchers = {}
+
+
+def scan_keywords(text, groups=None):
+    """Find the keywords of every group, or only of the tuple groups, in one scan of an already lowercased text
+
+    Of the groups in FIRST_MATCH_GROUPS, the hits may hold only the
+    highest-priority label found; read those with first_match.
+    """
+    if groups is None:
+        return _automaton.find(text)
+    matcher = _matchers.get(groups)
+    if matcher is None:
+        matcher = _matchers[groups] = build_automaton({group: keyword_groups[group] for group in groups},
+                                                      first_only=FIRST_MATCH_GROUPS)
+    return matcher.find(text)
+
+
+def first_match(hits, group, default):
+    """Return the highest-priority label of a group found in the hits"""
+    best = None
+    for hit in hits:
+        if hit[0] == group and (best is None or hit[1] < best[1]):
+            best = hit
+    return best[2] if best is not None else default
+
+
+def all_matches(hits, group):
+    """Return every label of a group found in the hits, in vocabulary order"""
+    return [label for hit_group, _, label in sorted(hits) if hit_group == group]
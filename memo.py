@@ -0,0 +1,176 @@
+# Unique-value memoization for the per-row text functions
+import hashlib
+import os
+import pickle
+import sys
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from instrumentation import instrumentation
+from parallel import map_rows
+
+# Strings longer than this are keyed by a digest so the cache does not keep them alive
+DIGEST_MIN_LENGTH = 64
+
+# Default bounds of the cache: results of the text-to-text functions are whole
+# descriptions, so the byte bound is the one that keeps long runs flat
+DEFAULT_MAXSIZE = 1_000_000
+DEFAULT_MAXBYTES = 64 << 20
+
+# Approximate bytes of one entry besides its key value and result (dict slot, key tuple)
+ENTRY_OVERHEAD = 200
+
+
+def _value_key(value):
+    if isinstance(value, str):
+        if len(value) < DIGEST_MIN_LENGTH:
+            return value
+        return hashlib.blake2b(value.encode('utf-8', 'surrogatepass'), digest_size=16).digest()
+    # NaN != NaN, so other values are keyed by type and repr
+    return (type(value).__name__, repr(value))
+
+
+def _sizeof(value):
+    """Approximate memory held by a result: the object plus the items of tuples and lists"""
+    if isinstance(value, (tuple, list)):
+        return sys.getsizeof(value) + sum(_sizeof(item) for item in value)
+    return sys.getsizeof(value)
+
+
+def function_name(func):
+    """Cache key of a function: module and qualified name, so same-named functions do not collide"""
+    qualname = getattr(func, '__qualname__', None)
+    if qualname is None:
+        return repr(func)
+    return f'{func.__module__}.{qualname}'
+
+
+class MemoCache:
+    """Bounded LRU of per-row function results, with per-function hit counters
+
+    Entries are keyed by function name and input value (a digest for long
+    strings). The least recently used entries are dropped beyond maxsize
+    entries or maxbytes (approximate) of keys and results. The cache can
+    outlive one chunk, and with save/load one run.
+    """
+
+    def __init__(self, maxsize=DEFAULT_MAXSIZE, maxbytes=DEFAULT_MAXBYTES):
+        self.maxsize = maxsize
+        self.maxbytes = maxbytes
+        self.nbytes = 0
+        self._entries = OrderedDict()
+        self._sizes = {}
+        self.stats = {}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        try:
+            self._entries.move_to_end(key)
+        except KeyError:
+            return None, False
+        return self._entries[key], True
+
+    def put(self, key, result):
+        size = ENTRY_OVERHEAD + _sizeof(key[1]) + _sizeof(result)
+        self.nbytes += size - self._sizes.get(key, 0)
+        self._sizes[key] = size
+        self._entries[key] = result
+        self._entries.move_to_end(key)
+        self._evict()
+
+    def _evict(self):
+        while self._entries and (len(self._entries) > self.maxsize or self.nbytes > self.maxbytes):
+            key, _ = self._entries.popitem(last=False)
+            self.nbytes -= self._sizes.pop(key)
+
+    def clear(self):
+        self._entries.clear()
+        self._sizes.clear()
+        self.nbytes = 0
+        self.stats = {}
+
+    def record(self, name, rows, unique, hits):
+        counts = self.stats.setdefault(name, {'rows': 0, 'unique': 0, 'hits': 0, 'computed': 0})
+        counts['rows'] += rows
+        counts['unique'] += unique
+        counts['hits'] += hits
+        counts['computed'] += unique - hits
+
+    def report(self):
+        """Hit-rate metrics per function: rows seen, calls made and work saved"""
+        report = {}
+        for name, counts in self.stats.items():
+            saved = counts['rows'] - counts['computed']
+            report[name] = dict(counts, saved=saved,
+                                saved_pct=round(100 * saved / counts['rows'], 1) if counts['rows'] else 0.0)
+        return report
+
+    def print_report(self):
+        print('\n=== MEMOIZATION ===')
+        for name, counts in self.report().items():
+            print(f"{name}: {counts['rows']:,} rows, {counts['unique']:,} unique, "
+                  f"{counts['hits']:,} cache hits, {counts['computed']:,} computed "
+                  f"({counts['saved_pct']}% of calls saved)")
+
+    def save(self, path, tag=None):
+        """Write the entries; tag names what they were computed with (e.g. the code fingerprint)"""
+        with open(path + '.tmp', 'wb') as f:
+            pickle.dump((tag, self._entries), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(path + '.tmp', path)
+
+    def load(self, path, tag=None):
+        """Read the entries saved with the same tag; entries saved with another one are stale"""
+        if os.path.exists(path):
+            with open(path, 'rb') as f:
+                saved = pickle.load(f)
+            saved_tag, entries = saved if isinstance(saved, tuple) else (None, saved)
+            if saved_tag == tag:
+                self.clear()
+                for key, result in entries.items():
+                    self.put(key, result)
+        return self
+
+
+# Shared by every stage of a run, so repeated values across chunks are reused
+memo_cache = MemoCache()
+
+
+def memo_map(series, func, cache=None, workers=1):
+    """Apply func to each distinct value of series and broadcast the results back
+
+    Equivalent to series.map(func). The column is factorized, so func runs
+    once per distinct value (NaN included) not yet in the cache. Those calls
+    go through parallel.map_rows, so they can use a process pool.
+    """
+    cache = memo_cache if cache is None else cache
+    name = function_name(func)
+    label = getattr(func, '__qualname__', name)
+    with instrumentation.step(label, series) as step:
+        return step.output(_memo_map(series, func, cache, name, label, workers))
+
+
+def _memo_map(series, func, cache, name, label, workers):
+    codes, uniques = pd.factorize(series, use_na_sentinel=False)
+    results = np.empty(len(uniques), dtype=object)
+    keys = []
+    missing = []
+    for i, value in enumerate(uniques):
+        key = (name, _value_key(value))
+        result, hit = cache.get(key)
+        if hit:
+            results[i] = result
+        else:
+            keys.append(key)
+            missing.append(i)
+
+    computed = map_rows(func, [uniques[i] for i in missing], workers)
+    for i, key, result in zip(missing, keys, computed):
+        results[i] = result
+        cache.put(key, result)
+
+    cache.record(label, len(codes), len(uniques), len(uniques) - len(missing))
+    return pd.Series(results[codes], index=series.index, dtype=object)
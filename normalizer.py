@@ -0,0 +1,44 @@
+# Single-pass text normalizers for the LinkedIn Jobs pipeline
+import re
+
+# Define special characters to remove from dataset
+spec_chars = ["!", '"', "#", "%", "&", "'", "(", ")",
+              "*", "+", ",", "-", ".", "/", ":", ";", "<",
+              "=", ">", "?", "@", "[", "\\", "]", "^", "_",
+              "`", "{", "|", "}", "~", "–"]
+
+# Translation tables are built once: one maps every special character to a
+# space, the other deletes them. str.translate applies either in a single scan.
+SPEC_CHARS_TO_SPACE = str.maketrans({char: ' ' for char in spec_chars})
+SPEC_CHARS_REMOVED = str.maketrans('', '', ''.join(spec_chars))
+
+# Characters stripped by remove_unwanted_characters
+UNWANTED_CHARS = re.compile(r'[*/_?%@#!,+&]')
+
+# Anything that is not a letter or a digit
+NON_ALNUM = re.compile(r'[^a-zA-Z0-9]')
+
+
+def replace_spec_chars(series):
+    """Replace every special character in a string column with a space"""
+    return series.str.translate(SPEC_CHARS_TO_SPACE)
+
+
+def remove_spec_chars(series):
+    """Delete every special character from a string column"""
+    return series.str.translate(SPEC_CHARS_REMOVED)
+
+
+def remove_unwanted_characters(s):
+    """Replace the unwanted punctuation characters with a space"""
+    return UNWANTED_CHARS.sub(' ', str(s))
+
+
+def normalize_text(s):
+    """Replace every non-alphanumeric character with a space
+
+    Equivalent to remove_unwanted_characters followed by the
+    [^a-zA-Z0-9] substitution, since the unwanted characters are a
+    subset of the non-alphanumeric ones.
+    """
+    return NON_ALNUM.sub(' ', str(s))
@@ -0,0 +1,53 @@
+# Process-pool execution of the per-row extractors
+import os
+from functools import partial
+from multiprocessing import get_context
+
+# Below this many rows per worker a pool costs more than it saves
+MIN_SHARD_SIZE = 2000
+
+
+def resolve_workers(workers):
+    """Turn a --workers value into a process count (0 or None = every core)"""
+    if not workers:
+        return os.cpu_count() or 1
+    return max(1, int(workers))
+
+
+def split_shards(values, n_shards):
+    """Split a list into n_shards contiguous shards of near-equal size"""
+    size, extra = divmod(len(values), n_shards)
+    shards = []
+    start = 0
+    for i in range(n_shards):
+        end = start + size + (1 if i < extra else 0)
+        shards.append(values[start:end])
+        start = end
+    return shards
+
+
+def map_shards(func, values, workers=1):
+    """Apply func to contiguous shards of values and merge the results in order
+
+    func takes a list and returns a list of the same length; it must be a
+    module-level function so worker processes can import it. With one worker,
+    or too few values to be worth a pool, func runs serially in this process.
+    """
+    values = list(values)
+    workers = min(resolve_workers(workers), len(values) // MIN_SHARD_SIZE)
+    if workers <= 1:
+        return func(values)
+
+    with get_context().Pool(workers) as pool:
+        results = pool.map(func, split_shards(values, workers))
+    return [item for shard in results for item in shard]
+
+
+def apply_each(func, values):
+    """Apply func to every value of a shard"""
+    return [func(value) for value in values]
+
+
+def map_rows(func, values, workers=1):
+    """Apply a module-level per-row function to values across a process pool"""
+    return map_shards(partial(apply_each, func), values, workers)
@@ -0,0 +1,232 @@
+# Staged pipeline with on-disk caching of every stage's output
+import glob
+import hashlib
+import inspect
+import json
+import os
+import pickle
+import re
+import sys
+import types
+
+from instrumentation import instrumentation
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# Modules that time or orchestrate the stages without changing their output
+NEUTRAL_MODULES = {'instrumentation', 'pipeline'}
+
+
+def fingerprint_input(source):
+    """Hash the pipeline input: the bytes of a file, or the contents of a DataFrame"""
+    digest = hashlib.blake2b(digest_size=16)
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+    else:
+        import pandas as pd
+        digest.update(pd.util.hash_pandas_object(source, index=True).values.tobytes())
+        digest.update(repr(list(source.columns)).encode())
+    return digest.hexdigest()
+
+
+def _local_module(obj):
+    """The module of this repository obj belongs to (or is), None for the standard library and packages"""
+    module = obj if isinstance(obj, types.ModuleType) else sys.modules.get(getattr(obj, '__module__', None) or '')
+    path = getattr(module, '__file__', None)
+    if path is None or os.path.dirname(os.path.abspath(path)) != ROOT or module.__name__ in NEUTRAL_MODULES:
+        return None
+    return module
+
+
+def _names(obj):
+    """Global and attribute names used by the code of a function, or of the methods of a class, nested code included"""
+    if isinstance(obj, type):
+        members = [getattr(member, '__func__', None) or getattr(member, 'fget', None) or member
+                   for member in vars(obj).values()]
+        return {name for member in members for name in _names(inspect.unwrap(member))}
+    names = set()
+    stack = [getattr(obj, '__code__', None)]
+    while stack:
+        code = stack.pop()
+        if code is not None:
+            names.update(code.co_names)
+            stack.extend(const for const in code.co_consts if isinstance(const, types.CodeType))
+    return names
+
+
+def _data_text(value):
+    """JSON form of a constant made of plain data and compiled patterns, None for any other object"""
+    def plain(item):
+        if isinstance(item, re.Pattern):
+            return [item.pattern, item.flags]
+        if isinstance(item, (set, frozenset)):
+            return sorted(item, key=repr)
+        raise TypeError(type(item).__name__)
+    try:
+        return json.dumps(value, sort_keys=True, default=plain)
+    except (TypeError, ValueError):
+        return None
+
+
+def code_sources(obj):
+    """Source texts the behaviour of a function or class depends on, by name
+
+    Its own source and, recursively, that of the functions, classes and
+    constants it uses by name, in whichever module of this repository they
+    live; a repository module the code uses (e.g. keywords.scan_keywords) is
+    searched for the names the code looks up. Instances are covered by their
+    class. The standard library and installed packages are not included.
+    """
+    if _local_module(obj) is None:
+        return {repr(obj): ''}
+    texts, seen = {}, set()
+    stack = [obj]
+    while stack:
+        item = inspect.unwrap(stack.pop())
+        if id(item) in seen:
+            continue
+        seen.add(id(item))
+        home = _local_module(item)
+        if home is None or isinstance(item, types.ModuleType):
+            continue
+        texts[f'{home.__name__}.{item.__qualname__}'] = inspect.getsource(item)
+
+        names = _names(item)
+        scopes = [home] + [value for value in map(home.__dict__.get, names)
+                           if isinstance(value, types.ModuleType) and _local_module(value) is not None]
+        for scope in scopes:
+            for name in names:
+                value = scope.__dict__.get(name)
+                if value is None or isinstance(value, types.ModuleType) or name.startswith('__'):
+                    continue
+                if callable(value):
+                    stack.append(value)
+                    continue
+                # Instances are covered by their class; their state is not hashed
+                if _local_module(type(value)) is not None:
+                    stack.append(type(value))
+                text = _data_text(value)
+                if text is not None:
+                    texts[f'{scope.__name__}.{name}'] = text
+    return texts
+
+
+def fingerprint_code(obj):
+    """Hash a function or class by the sources it depends on (see code_sources), any other object by its JSON/repr form"""
+    if callable(obj):
+        try:
+            text = json.dumps(code_sources(obj), sort_keys=True)
+        except (OSError, TypeError):
+            text = repr(obj)
+    else:
+        text = json.dumps(obj, sort_keys=True, default=repr)
+    return hashlib.blake2b(text.encode(), digest_size=16).hexdigest()
+
+
+class Stage:
+    """A named step of the pipeline
+
+    func receives the previous stage's output (the input source for the first
+    stage) and returns this stage's output. The cache key covers the sources
+    func depends on (see code_sources), those of every object in depends
+    (helpers it reaches indirectly, vocabularies and other data) and config,
+    which is also passed to func as keyword arguments. options are passed
+    too but do not affect the output, so they are not hashed.
+    """
+
+    def __init__(self, name, func, depends=(), config=None, options=None, cache=True):
+        self.name = name
+        self.func = func
+        self.depends = list(depends)
+        self.config = config or {}
+        self.options = options or {}
+        self.cache = cache
+
+    def fingerprint(self):
+        parts = [fingerprint_code(self.func)]
+        parts += [fingerprint_code(obj) for obj in self.depends]
+        parts.append(fingerprint_code(self.config))
+        return hashlib.blake2b(''.join(parts).encode(), digest_size=16).hexdigest()
+
+    def run(self, data):
+        return self.func(data, **self.config, **self.options)
+
+
+class Pipeline:
+    """Run stages in order, reusing cached outputs that are still valid
+
+    The key of a stage chains the input fingerprint with the fingerprints of
+    that stage and of every stage before it, so editing one stage only
+    invalidates it and the stages after it. A run starts from the latest
+    stage whose output is cached.
+    """
+
+    def __init__(self, stages, cache_dir='.pipeline_cache', verbose=True):
+        self.stages = list(stages)
+        self.cache_dir = cache_dir
+        self.verbose = verbose
+
+    def stage_names(self):
+        return [stage.name for stage in self.stages]
+
+    def stage_keys(self, source):
+        key = fingerprint_input(source)
+        keys = []
+        for stage in self.stages:
+            key = hashlib.blake2b((key + stage.fingerprint()).encode(), digest_size=16).hexdigest()
+            keys.append(key)
+        return keys
+
+    def _cache_path(self, index, stage, key):
+        return os.path.join(self.cache_dir, f'{index:02d}-{stage.name}-{key}.pkl')
+
+    def _log(self, message):
+        if self.verbose:
+            print(f'[pipeline] {message}')
+
+    def run(self, source, until=None):
+        """Run the pipeline on source, up to and including the stage named until"""
+        stages = self.stages
+        if until is not None:
+            stages = stages[:self.stage_names().index(until) + 1]
+
+        keys = self.stage_keys(source) if self.cache_dir else [None] * len(stages)
+
+        # Resume from the latest stage whose output is cached
+        start, data = 0, source
+        if self.cache_dir:
+            for index in reversed(range(len(stages))):
+                path = self._cache_path(index, stages[index], keys[index])
+                if stages[index].cache and os.path.exists(path):
+                    with open(path, 'rb') as f:
+                        data = pickle.load(f)
+                    start = index + 1
+                    self._log(f'{stages[index].name}: loaded from cache')
+                    break
+
+        for index in range(start, len(stages)):
+            stage = stages[index]
+            self._log(f'{stage.name}: running')
+            with instrumentation.step(stage.name, data) as step:
+                data = step.output(stage.run(data))
+            if self.cache_dir and stage.cache:
+                self._store(index, stage, keys[index], data)
+        return data
+
+    def _store(self, index, stage, key, data):
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+        # Only the latest output of each stage is kept
+        for stale in glob.glob(os.path.join(self.cache_dir, f'{index:02d}-{stage.name}-*.pkl')):
+            os.remove(stale)
+
+        path = self._cache_path(index, stage, key)
+        with open(path + '.tmp', 'wb') as f:
+            pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(path + '.tmp', path)
+
+    def clear_cache(self):
+        for path in glob.glob(os.path.join(self.cache_dir, '*.pkl')):
+            os.remove(path)
@@ -0,0 +1,147 @@
+# Quality control of the cleaned descriptions: vectorized signals and rule-based filtering
+import numpy as np
+import pandas as pd
+
+# ASCII bytes str.split() splits on
+SPACE_BYTES = np.zeros(256, dtype=bool)
+SPACE_BYTES[[9, 10, 11, 12, 13, 28, 29, 30, 31, 32]] = True
+
+# Strings per block of the byte-level word count, bounding its temporary arrays
+WORD_COUNT_BLOCK = 50_000
+
+# Rules of the original script: drop posts of 20 words or fewer
+DEFAULT_RULES = {'min_words': 21, 'std_cutoff': None, 'duplicates': False}
+
+# Columns that make two postings duplicates
+DUPLICATE_COLUMNS = ['position', 'company', 'description']
+
+
+def _block_word_counts(array):
+    """Word counts of a large_string array, NaN where a string needs str.split
+
+    A word starts at a non-space byte that follows a space or the start of
+    its string; the starts are found over the whole byte buffer at once.
+    """
+    import pyarrow.compute as pc
+    _, offsets, data = array.buffers()
+    offsets = np.frombuffer(offsets, dtype=np.int64)[array.offset:array.offset + len(array) + 1]
+    data = np.frombuffer(data, dtype=np.uint8)[offsets[0]:offsets[-1]] if data is not None else np.zeros(0, np.uint8)
+    offsets = offsets - offsets[0]
+
+    space = data <= 32
+    starts = np.empty(len(data), dtype=bool)
+    starts[:1] = True
+    starts[1:] = space[:-1]
+    starts[offsets[:-1][offsets[:-1] < len(data)]] = True
+    starts &= ~space
+    counts = np.diff(np.searchsorted(np.flatnonzero(starts), offsets)).astype(float)
+
+    # Non-ASCII strings may hold Unicode spaces, and ASCII control bytes other than the
+    # whitespace ones are not spaces; both are left to str.split
+    other = ~pc.fill_null(pc.string_is_ascii(array), True).to_numpy(zero_copy_only=False)
+    control = np.flatnonzero(data < 32)
+    control = control[~SPACE_BYTES[data[control]]]
+    other[np.searchsorted(offsets, control, 'right') - 1] = True
+    counts[other | array.is_null().to_numpy(zero_copy_only=False)] = np.nan
+    return counts
+
+
+def word_counts(text):
+    """len(value.split()) of every string, as floats with NaN for missing values, without per-row token lists"""
+    try:
+        import pyarrow as pa
+    except ImportError:
+        return text.map(lambda value: len(value.split()), na_action='ignore').astype(float)
+
+    array = pa.array(text, type=pa.large_string(), from_pandas=True)
+    if isinstance(array, pa.ChunkedArray):
+        array = array.combine_chunks()
+    counts = np.empty(len(array))
+    for start in range(0, len(array), WORD_COUNT_BLOCK):
+        counts[start:start + WORD_COUNT_BLOCK] = _block_word_counts(array.slice(start, WORD_COUNT_BLOCK))
+
+    rest = np.flatnonzero(np.isnan(counts) & ~array.is_null().to_numpy(zero_copy_only=False))
+    counts[rest] = [len(value.split()) for value in array.take(pa.array(rest)).to_pylist()]
+    return pd.Series(counts, index=text.index)
+
+
+def quality_signals(text):
+    """Signals the rules read, one row per description: its word count, from a vectorized pass over the text"""
+    return pd.DataFrame({'words': word_counts(text)}, index=text.index)
+
+
+def duplicate_hashes(df):
+    """64-bit hash of every posting over DUPLICATE_COLUMNS"""
+    columns = [column for column in DUPLICATE_COLUMNS if column in df.columns]
+    return pd.util.hash_pandas_object(df[columns], index=False).to_numpy()
+
+
+class QualityFilter:
+    """Drops low-quality postings by rule and counts the drops per rule, over one frame or many chunks
+
+    Rules run in order and a dropped posting is counted under the first rule
+    that drops it:
+        min_words   postings with fewer words are dropped
+        std_cutoff  postings more than this many standard deviations below
+                    the mean word count are dropped; the mean and deviation
+                    are those of the moments given here (the whole input,
+                    for chunked runs), else of those passed to apply, else
+                    of the frame
+        duplicates  repeats of a posting already kept (same DUPLICATE_COLUMNS),
+                    in this frame or an earlier chunk
+    """
+
+    def __init__(self, min_words=DEFAULT_RULES['min_words'], std_cutoff=None, duplicates=False, moments=None):
+        self.rules = {'min_words': min_words, 'std_cutoff': std_cutoff, 'duplicates': duplicates}
+        self.moments = moments
+        self.rows_in = 0
+        self.drops = {rule: 0 for rule in self.rules}
+        self._seen = set()
+
+    def keep_masks(self, signals, moments=None, hashes=None):
+        """Boolean keep mask of every active rule, in order; hashes are needed for duplicates"""
+        words = signals['words'].to_numpy(dtype=float, na_value=np.nan)
+        masks = {}
+        if self.rules['min_words']:
+            masks['min_words'] = words >= self.rules['min_words']
+        if self.rules['std_cutoff'] is not None:
+            moments = self.moments if self.moments is not None else moments
+            if moments is not None:
+                mean, std = moments.mean, moments.std
+            else:
+                mean, std = np.nanmean(words), np.nanstd(words, ddof=1)
+            masks['std_cutoff'] = ~(words < mean - self.rules['std_cutoff'] * std)
+        if self.rules['duplicates']:
+            seen = np.fromiter(self._seen, dtype=np.uint64, count=len(self._seen))
+            masks['duplicates'] = ~(pd.Series(hashes).duplicated().to_numpy() | np.isin(hashes, seen))
+        return masks
+
+    def apply(self, df, signals, moments=None):
+        """df without the dropped postings, re-indexed from 0"""
+        hashes = duplicate_hashes(df) if self.rules['duplicates'] else None
+        masks = self.keep_masks(signals, moments, hashes)
+        keep = np.ones(len(df), dtype=bool)
+        for rule, mask in masks.items():
+            self.drops[rule] += int((keep & ~mask).sum())
+            keep &= mask
+        self.rows_in += len(df)
+        if hashes is not None:
+            self._seen.update(hashes[keep].tolist())
+
+        # One take of the surviving rows; the index is replaced rather than copied by reset_index
+        if not keep.all():
+            df = df.iloc[np.flatnonzero(keep)]
+        df.index = pd.RangeIndex(len(df))
+        return df
+
+    def report(self):
+        kept = self.rows_in - sum(self.drops.values())
+        return {'rows_in': self.rows_in, 'rows_kept': kept, 'rules': dict(self.rules), 'drops': dict(self.drops)}
+
+    def print_report(self):
+        report = self.report()
+        print('\n=== QUALITY ===')
+        for rule, value in report['rules'].items():
+            if value:
+                print(f"{rule} ({value}): {report['drops'][rule]:,} posts dropped")
+        print(f"{report['rows_kept']:,} of {report['rows_in']:,} posts kept")
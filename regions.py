@@ -0,0 +1,70 @@
+# City to region resolution driven by config/regions.json
+import json
+import os
+import re
+from functools import lru_cache
+
+REGIONS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'config', 'regions.json')
+
+
+def load_region_rules(path=REGIONS_FILE):
+    """Load the ordered (region, cities) rules from a JSON table"""
+    with open(path, encoding='utf-8') as f:
+        table = json.load(f)
+    rules = []
+    for rule in table['rules']:
+        if not rule.get('region') or not rule.get('cities'):
+            raise ValueError(f'Region rule needs a region and at least one city: {rule}')
+        rules.append((rule['region'], list(rule['cities'])))
+    return rules
+
+
+class RegionResolver:
+    """Map city names to regions with the same result as the sequential rules
+
+    The rules are applied in order to a value, and each rule whose cities
+    occur in the current value (substring match) replaces it with the
+    rule's region. A value no rule matches is kept as is.
+
+    Cities of the table resolve through a hash index. Other values are
+    first checked against one combined regex of every city, so most of them
+    cost a single search. Every distinct value is resolved once and cached.
+    """
+
+    def __init__(self, rules):
+        self.rules = [(region, re.compile('|'.join(map(re.escape, cities)))) for region, cities in rules]
+        self._any_city = re.compile('|'.join(re.escape(city) for _, cities in rules for city in cities))
+        self._cache = {}
+
+        # Exact index over the table's own city names
+        self._index = {city: self._apply_rules(city) for _, cities in rules for city in cities}
+
+    def _apply_rules(self, value):
+        for region, pattern in self.rules:
+            if pattern.search(value):
+                value = region
+        return value
+
+    def resolve(self, value):
+        """Region of one city value"""
+        if not isinstance(value, str):
+            return value
+        region = self._index.get(value)
+        if region is not None:
+            return region
+        region = self._cache.get(value)
+        if region is None:
+            region = self._apply_rules(value) if self._any_city.search(value) else value
+            self._cache[value] = region
+        return region
+
+    def resolve_series(self, series):
+        """Resolve each distinct value of a column once and broadcast the result"""
+        mapping = {value: self.resolve(value) for value in series.dropna().unique()}
+        return series.map(mapping)
+
+
+@lru_cache(maxsize=None)
+def region_resolver(path=REGIONS_FILE):
+    """Resolver for a regions table, built once per process"""
+    return RegionResolver(load_region_rules(path))
@@ -0,0 +1,207 @@
+# Materialized rollup of the postings: counts and sums per region, industry, month, job type and seniority
+#
+#   python rollup.py build data_jobs.parquet data_jobs.rollup.parquet
+#   python rollup.py add data_jobs.rollup.parquet new_jobs.parquet
+#   python rollup.py query data_jobs.rollup.parquet --by industry_cat --where Regions=Riyadh
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from compact import expand_frame
+from data_enhancements import seniority_levels
+from storage import read_table, write_table
+
+# The base cuboid is kept per combination of these; any coarser rollup is a sum over it
+DIMENSIONS = ['Regions', 'industry_cat', 'month', 'quarter', 'job_type', 'seniority_level']
+
+# Additive measures, so rollups of different rows add up to the rollup of all of them
+MEASURES = ['posts', 'year_of_ex_sum', 'year_of_ex_count', 'remote', 'salary']
+
+# Other names accepted for the dimensions in queries
+DIMENSION_ALIASES = {'region': 'Regions', 'regions': 'Regions', 'industry': 'industry_cat', 'type': 'job_type',
+                     'seniority': 'seniority_level'}
+
+
+def rollup_counts(df):
+    """Base cuboid of a table of postings: the MEASURES per distinct combination of DIMENSIONS
+
+    Takes the output of text_processing.py or data_enhancements.py; the
+    seniority is derived from the level and experience when the table has
+    none.
+    """
+    if 'seniority_level' not in df.columns:
+        df = df.assign(seniority_level=seniority_levels(df))
+    missing = [column for column in DIMENSIONS if column not in df.columns]
+    if missing:
+        raise ValueError(f'The table has no {missing} column(s) to roll up by')
+
+    years = pd.to_numeric(df['year_of_ex'], errors='coerce') if 'year_of_ex' in df.columns \
+        else pd.Series(np.nan, index=df.index)
+    if 'is_remote' in df.columns:
+        remote = df['is_remote'].astype(bool)
+    else:
+        remote = df['Regions'].astype(str).str.contains('Remote', regex=False)
+    salary = df['salary_mentioned'].notna() if 'salary_mentioned' in df.columns else False
+
+    cells = pd.DataFrame({column: df[column].astype(object) for column in DIMENSIONS})
+    cells = cells.assign(posts=1, year_of_ex_sum=years.fillna(0), year_of_ex_count=years.notna(),
+                         remote=remote, salary=salary)
+    return combine(cells)
+
+
+def combine(cells):
+    """Sum cells with the same DIMENSIONS, missing values included"""
+    cells = cells.groupby(DIMENSIONS, dropna=False, sort=False)[MEASURES].sum().reset_index()
+    for column in MEASURES:
+        if column != 'year_of_ex_sum':
+            cells[column] = cells[column].astype(np.int64)
+    return cells
+
+
+class Rollup:
+    """Base cuboid of the postings, updated with new rows and queried at any coarser level
+
+    Counts and sums add up, so a rollup is updated by combining it with the
+    cuboid of the new rows alone, and a query sums the (small) cuboid over
+    the dimensions it leaves out instead of scanning the postings.
+    """
+
+    def __init__(self, cells=None):
+        self.cells = cells if cells is not None else pd.DataFrame(columns=DIMENSIONS + MEASURES)
+
+    @classmethod
+    def from_frame(cls, df):
+        return cls(rollup_counts(df))
+
+    def add(self, df):
+        """Add the postings of df"""
+        return self.merge(rollup_counts(df))
+
+    def merge(self, cells):
+        """Add the cells of another rollup (e.g. one computed in a worker)"""
+        if cells is not None and len(cells):
+            self.cells = combine(pd.concat([self.cells, cells], ignore_index=True)) if len(self.cells) else cells
+        return self
+
+    @property
+    def posts(self):
+        return int(self.cells['posts'].sum())
+
+    def query(self, by=(), where=None):
+        """Posts, mean experience and remote and salary shares, per combination of the by dimensions
+
+        where maps dimensions to a value or a list of values to keep.
+        Groups are sorted by number of posts, largest first.
+        """
+        by = [resolve_dimension(column) for column in by]
+        cells = self.cells
+        for column, values in (where or {}).items():
+            column = resolve_dimension(column)
+            values = values if isinstance(values, (list, tuple, set)) else [values]
+            cells = cells[cells[column].isin(list(values))]
+
+        if by:
+            totals = cells.groupby(by, dropna=False, sort=False)[MEASURES].sum()
+        else:
+            totals = cells[MEASURES].sum().to_frame('all').T
+        counts = totals['year_of_ex_count']
+        result = pd.DataFrame({
+            'posts': totals['posts'].astype(np.int64),
+            'share': totals['posts'] / max(int(cells['posts'].sum()), 1),
+            'mean_year_of_ex': totals['year_of_ex_sum'] / counts.where(counts > 0),
+            'remote_share': totals['remote'] / totals['posts'].where(totals['posts'] > 0),
+            'salary_share': totals['salary'] / totals['posts'].where(totals['posts'] > 0),
+        }, index=totals.index)
+        return result.sort_values('posts', ascending=False, kind='stable')
+
+    def save(self, path):
+        """Write the cuboid with categorical dimensions and the smallest integer measures"""
+        cells = self.cells.copy()
+        for column in ['month', 'quarter'] + MEASURES:
+            values = cells[column]
+            if values.notna().all() and len(values) and (values % 1 == 0).all():
+                cells[column] = pd.to_numeric(values.astype(np.int64), downcast='unsigned')
+        write_table(cells, path)
+
+    @classmethod
+    def load(cls, path):
+        cells = read_table(path, categoricals=False)
+        for column in DIMENSIONS:
+            cells[column] = cells[column].astype(object)
+        # Back to wide types, so sums over the downcast counts cannot overflow
+        for column in MEASURES:
+            cells[column] = cells[column].astype(float if column == 'year_of_ex_sum' else np.int64)
+        return cls(cells)
+
+    def print_report(self):
+        print('\n=== ROLLUP ===')
+        print(f"{self.posts:,} posts in {len(self.cells):,} cells of "
+              f"{' x '.join(DIMENSIONS)}")
+
+
+def resolve_dimension(name):
+    column = DIMENSION_ALIASES.get(name.lower(), name)
+    if column not in DIMENSIONS:
+        raise KeyError(f"Unknown dimension '{name}'; expected one of {DIMENSIONS}")
+    return column
+
+
+def parse_where(clauses):
+    """{dimension: [values]} of 'dimension=value[,value...]' clauses; month and quarter as integers"""
+    where = {}
+    for clause in clauses:
+        name, sep, values = clause.partition('=')
+        if not sep:
+            raise ValueError(f"Expected dimension=value, got '{clause}'")
+        column = resolve_dimension(name.strip())
+        values = [value.strip() for value in values.split(',')]
+        where[column] = [int(value) for value in values] if column in ('month', 'quarter') else values
+    return where
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build, update and query the rollup of the processed LinkedIn job posts')
+    commands = parser.add_subparsers(dest='command', required=True)
+    build = commands.add_parser('build', help='roll up a table of posts')
+    build.add_argument('input', help='output of text_processing.py or data_enhancements.py')
+    build.add_argument('rollup', help='Parquet, Arrow or CSV file to write the rollup to')
+    add = commands.add_parser('add', help='add the posts of another table to a rollup')
+    add.add_argument('rollup')
+    add.add_argument('input', nargs='+', help='tables of new posts')
+    query = commands.add_parser('query', help='totals from a rollup')
+    query.add_argument('rollup')
+    query.add_argument('--by', default='', help='comma-separated dimensions, e.g. Regions,job_type')
+    query.add_argument('--where', action='append', default=[], help='e.g. industry_cat=Oil or month=1,2,3')
+    query.add_argument('--top', type=int, default=20, help='print this many groups')
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        rollup = Rollup.from_frame(expand_frame(read_table(args.input, categoricals=False)))
+        rollup.save(args.rollup)
+        rollup.print_report()
+        print(f"Rollup saved to '{args.rollup}' ({os.path.getsize(args.rollup):,} bytes)")
+    elif args.command == 'add':
+        rollup = Rollup.load(args.rollup)
+        for path in args.input:
+            rollup.add(expand_frame(read_table(path, categoricals=False)))
+        rollup.save(args.rollup)
+        rollup.print_report()
+    else:
+        start = time.perf_counter()
+        rollup = Rollup.load(args.rollup)
+        try:
+            by = [column for column in args.by.split(',') if column]
+            result = rollup.query(by, parse_where(args.where))
+        except (KeyError, ValueError) as e:
+            parser.error(e.args[0])
+        elapsed = time.perf_counter() - start
+        pd.set_option('display.width', 200, 'display.max_columns', None)
+        print(result.head(args.top).round(3))
+        print(f'\n{len(result):,} groups from {len(rollup.cells):,} cells ({elapsed * 1000:.1f} ms)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,365 @@
+# Extraction rules driven by config/rules.json: loaded, validated and compiled into matchers
+#
+# Plain Python only, like extraction.py, so the extractors stay light to import.
+import hashlib
+import json
+import os
+import pickle
+import re
+from collections import deque
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+RULES_FILE = os.path.join(ROOT, 'config', 'rules.json')
+RULES_CACHE_DIR = os.path.join(ROOT, '.rules_cache')
+
+# Part of the config hash; bump it when the compiled form changes
+RULES_FORMAT = 3
+
+RULE_FIELDS = {'label', 'keywords', 'aliases', 'priority'}
+SECTIONS = ('keywords', 'seniority', 'industries')
+
+# Keyword groups the extractors read
+KEYWORD_GROUPS = ('skills', 'job_type', 'company_size', 'work_model', 'benefits', 'languages')
+
+# Groups read with keywords.first_match: only their highest-priority label is wanted
+FIRST_MATCH_GROUPS = ('job_type', 'company_size', 'work_model')
+
+
+class KeywordAutomaton:
+    """Aho-Corasick automaton that finds every keyword in one scan of the text
+
+    Keywords are given as (keyword, payload) pairs; find() returns the set of
+    payloads whose keyword occurs anywhere in the text, overlapping matches
+    included. The scan is linear in the text length whatever the number of
+    keywords.
+    """
+
+    def __init__(self, keywords):
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [set()]
+
+        # Build the trie
+        for keyword, payload in keywords:
+            if not keyword:
+                raise ValueError('Keywords must be non-empty strings')
+            state = 0
+            for char in keyword:
+                next_state = self._goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto[state][char] = next_state
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append(set())
+                state = next_state
+            self._out[state].add(payload)
+
+        # Breadth-first pass to set failure links and merge outputs
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[next_state] = self._goto[fail].get(char, 0)
+                self._out[next_state] |= self._out[self._fail[next_state]]
+
+        self._out = [frozenset(out) if out else None for out in self._out]
+
+    def find(self, text):
+        """Return the payloads of every keyword found in text"""
+        goto, fail, out = self._goto, self._fail, self._out
+        found = set()
+        state = 0
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if out[state] is not None:
+                found |= out[state]
+        return found
+
+
+class KeywordMatcher:
+    """Finds every keyword in a text like KeywordAutomaton, choosing the fastest scan available
+
+    Backends, in the order they are picked:
+        pyahocorasick   a C Aho-Corasick automaton, when pyahocorasick is
+                        installed; linear in the text at any vocabulary size
+        substring       C substring searches (str.__contains__), stopping at
+                        the first keyword found of each label; cheapest for
+                        vocabularies of up to SUBSTRING_MAX_KEYWORDS keywords
+        python          KeywordAutomaton, for larger vocabularies without
+                        pyahocorasick: one interpreted step per character,
+                        whatever the number of keywords
+    backend forces one of them (e.g. to benchmark them). exclusive maps
+    payloads to the key of a set of which only the first payload listed and
+    found is wanted; the substring backend then skips the rest of the set,
+    the others report every payload found. Pickled as its arguments and
+    rebuilt on load, so a cached matcher does not depend on the modules of
+    the process that made it.
+    """
+
+    BACKENDS = ('pyahocorasick', 'substring', 'python')
+
+    # Above this many keywords the substring searches cost more than the interpreted automaton
+    SUBSTRING_MAX_KEYWORDS = 150
+
+    def __init__(self, keywords, backend=None, exclusive=None):
+        if backend not in (None,) + self.BACKENDS:
+            raise ValueError(f'Unknown backend {backend!r}; expected one of {self.BACKENDS}')
+        self._keywords = list(keywords)
+        self._backend = backend
+        self._exclusive = dict(exclusive or {})
+        self._build()
+
+    def _build(self):
+        payloads = {}
+        for keyword, payload in self._keywords:
+            if not keyword:
+                raise ValueError('Keywords must be non-empty strings')
+            payloads.setdefault(keyword, set()).add(payload)
+
+        ahocorasick = None
+        if self._backend in (None, 'pyahocorasick'):
+            try:
+                import ahocorasick
+            except ImportError:
+                if self._backend:
+                    raise ImportError('The pyahocorasick backend needs pyahocorasick: '
+                                      'pip install pyahocorasick') from None
+        if ahocorasick is not None:
+            self.backend = 'pyahocorasick'
+            self._automaton = ahocorasick.Automaton()
+            for keyword, found in payloads.items():
+                self._automaton.add_word(keyword, frozenset(found))
+            self._automaton.make_automaton()
+        elif self._backend == 'substring' or (self._backend is None
+                                              and len(payloads) <= self.SUBSTRING_MAX_KEYWORDS):
+            self.backend = 'substring'
+            # Keywords with the same payloads (those of one label) are tried until one is found
+            labels = {}
+            for keyword, found in payloads.items():
+                labels.setdefault(frozenset(found), []).append(keyword)
+            # Labels of which every one found is wanted (those of one keyword tested in a single
+            # comprehension), then the exclusive sets with their labels in priority order
+            self._single, self._labels, sets = [], [], {}
+            for found, keywords in labels.items():
+                keys = {self._exclusive.get(payload) for payload in found}
+                key = keys.pop() if len(keys) == 1 else None
+                if key is not None:
+                    sets.setdefault(key, []).append((keywords, found))
+                elif len(keywords) == 1:
+                    self._single.append((keywords[0], found))
+                else:
+                    self._labels.append((keywords, found))
+            self._sets = list(sets.values())
+        else:
+            self.backend = 'python'
+            self._automaton = KeywordAutomaton(self._keywords)
+
+    def __getstate__(self):
+        return self._keywords, self._backend, self._exclusive
+
+    def __setstate__(self, state):
+        self._keywords, self._backend, self._exclusive = state
+        self._build()
+
+    def find(self, text):
+        """Return the payloads of every keyword found in text"""
+        found = set()
+        if self.backend == 'substring':
+            for payloads in [payloads for keyword, payloads in self._single if keyword in text]:
+                found |= payloads
+            for keywords, payloads in self._labels:
+                for keyword in keywords:
+                    if keyword in text:
+                        found |= payloads
+                        break
+            for labels in self._sets:
+                for keywords, payloads in labels:
+                    for keyword in keywords:
+                        if keyword in text:
+                            found |= payloads
+                            break
+                    else:
+                        continue
+                    break
+        elif self.backend == 'pyahocorasick':
+            for _, payloads in self._automaton.iter(text):
+                found |= payloads
+        else:
+            found = self._automaton.find(text)
+        return found
+
+
+def build_automaton(groups, backend=None, first_only=()):
+    """Compile keyword groups into one KeywordMatcher with (group, rank, label) payloads
+
+    The rank is the position of the label in its group, so hits can be put back
+    in vocabulary/priority order without walking the whole vocabulary. For the
+    groups in first_only the matcher may stop at the highest-priority label
+    found, which is all keywords.first_match reads.
+    """
+    payloads = [(keyword, (group, rank, label))
+                for group, labels in groups.items()
+                for rank, (label, keywords) in enumerate(labels.items())
+                for keyword in keywords]
+    exclusive = {payload: payload[0] for _, payload in payloads if payload[0] in first_only}
+    return KeywordMatcher(payloads, backend, exclusive)
+
+
+def read_rules(path=RULES_FILE):
+    """Parse a rules file: JSON, or YAML for .yaml/.yml files"""
+    with open(path, encoding='utf-8') as f:
+        if path.endswith(('.yaml', '.yml')):
+            try:
+                import yaml
+            except ImportError:
+                raise ImportError('YAML rules need PyYAML: pip install pyyaml') from None
+            return yaml.safe_load(f)
+        return json.load(f)
+
+
+def _normalize_entries(entries, where, lowercase):
+    """Validated {label: terms} of a list of rules, in priority order
+
+    A rule is a label string or an object with a label and optional keywords
+    (default: the label), aliases (more keywords) and priority (lower first;
+    ties keep the file order).
+    """
+    if not isinstance(entries, list) or not entries:
+        raise ValueError(f'{where}: expected a non-empty list of rules')
+    rules = []
+    for i, entry in enumerate(entries):
+        if isinstance(entry, str):
+            entry = {'label': entry}
+        if not isinstance(entry, dict):
+            raise ValueError(f'{where}[{i}]: a rule is a label or an object, not {entry!r}')
+        unknown = set(entry) - RULE_FIELDS
+        if unknown:
+            raise ValueError(f'{where}[{i}]: unknown fields {sorted(unknown)}; expected {sorted(RULE_FIELDS)}')
+        label = entry.get('label')
+        if not isinstance(label, str) or not label:
+            raise ValueError(f'{where}[{i}]: a rule needs a non-empty label')
+        priority = entry.get('priority', 0)
+        if not isinstance(priority, int) or isinstance(priority, bool):
+            raise ValueError(f'{where}[{i}] ({label}): priority must be an integer')
+
+        terms = []
+        for field in ('keywords', 'aliases'):
+            values = entry.get(field, [label] if field == 'keywords' else [])
+            if not isinstance(values, list) or not all(isinstance(value, str) and value for value in values):
+                raise ValueError(f'{where}[{i}] ({label}): {field} must be a list of non-empty strings')
+            terms += values
+        if not terms:
+            raise ValueError(f'{where}[{i}] ({label}): a rule needs at least one keyword')
+        if lowercase and any(term != term.lower() for term in terms):
+            raise ValueError(f'{where}[{i}] ({label}): keywords are matched in lowercased text, '
+                             f'so they must be lowercase: {terms}')
+        rules.append((priority, i, label, list(dict.fromkeys(terms))))
+
+    labels = [label for _, _, label, _ in rules]
+    duplicates = sorted({label for label in labels if labels.count(label) > 1})
+    if duplicates:
+        raise ValueError(f'{where}: duplicate labels {duplicates}')
+    return {label: terms for _, _, label, terms in sorted(rules)}
+
+
+def validate_rules(table, source='rules'):
+    """Normalized rules of a parsed rules file, or ValueError naming the faulty rule"""
+    if not isinstance(table, dict):
+        raise ValueError(f'{source}: expected an object with {", ".join(SECTIONS)}')
+    missing = [section for section in SECTIONS if section not in table]
+    unknown = sorted(set(table) - set(SECTIONS))
+    if missing or unknown:
+        raise ValueError(f'{source}: missing sections {missing}, unknown sections {unknown}')
+    if not isinstance(table['keywords'], dict) or not table['keywords']:
+        raise ValueError(f'{source}: keywords must map group names to lists of rules')
+    missing = [group for group in KEYWORD_GROUPS if group not in table['keywords']]
+    if missing:
+        raise ValueError(f'{source}: keywords needs the groups {missing}')
+    return {
+        'keywords': {group: _normalize_entries(entries, f'{source}: keywords.{group}', lowercase=True)
+                     for group, entries in table['keywords'].items()},
+        'seniority': _normalize_entries(table['seniority'], f'{source}: seniority', lowercase=True),
+        'industries': _normalize_entries(table['industries'], f'{source}: industries', lowercase=False),
+    }
+
+
+def rules_hash(rules):
+    """Digest of normalized rules, keying their compiled form
+
+    Labels are hashed as ordered pairs, since their order is their priority;
+    the order of the sections and groups does not matter.
+    """
+    ordered = {'keywords': {group: list(labels.items()) for group, labels in rules['keywords'].items()},
+               'seniority': list(rules['seniority'].items()), 'industries': list(rules['industries'].items())}
+    text = json.dumps([RULES_FORMAT, ordered], ensure_ascii=False, sort_keys=True)
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=16).hexdigest()
+
+
+class CompiledRules:
+    """Matchers compiled from validated rules
+
+    keyword_groups  {group: {label: keywords}}, labels in priority order
+    automaton       one KeywordMatcher over every keyword group
+    seniority       {label: keywords} matched in the lowercased job level
+    industry_pattern
+                    regex with one group matching any industry or alias; the
+                    earliest match in the text wins, and at one position the
+                    rule listed first
+    industry_aliases
+                    {alias: industry} for the matches to rename
+    """
+
+    def __init__(self, rules, digest):
+        self.hash = digest
+        self.keyword_groups = rules['keywords']
+        self.automaton = build_automaton(self.keyword_groups)
+        self.seniority = rules['seniority']
+        terms = [term for _, industry_terms in rules['industries'].items() for term in industry_terms]
+        self.industry_pattern = '(' + '|'.join(map(re.escape, terms)) + ')'
+        self.industry_aliases = {term: label for label, industry_terms in rules['industries'].items()
+                                 for term in industry_terms if term != label}
+
+
+_compiled = {}
+
+
+def compile_rules(rules, cache_dir=RULES_CACHE_DIR):
+    """CompiledRules of validated rules, reused by config hash in memory and on disk"""
+    digest = rules_hash(rules)
+    compiled = _compiled.get(digest)
+    if compiled is not None:
+        return compiled
+
+    path = os.path.join(cache_dir, f'rules-{digest}.pickle') if cache_dir else None
+    if path and os.path.exists(path):
+        # A cache written by other code is compiled again, like a missing one
+        try:
+            with open(path, 'rb') as f:
+                compiled = pickle.load(f)
+        except Exception:
+            compiled = None
+    if compiled is None:
+        compiled = CompiledRules(rules, digest)
+        if path:
+            # The cache is an optimization: a read-only checkout just compiles every time
+            try:
+                os.makedirs(cache_dir, exist_ok=True)
+                with open(path + '.tmp', 'wb') as f:
+                    pickle.dump(compiled, f, protocol=pickle.HIGHEST_PROTOCOL)
+                os.replace(path + '.tmp', path)
+            except OSError:
+                pass
+    _compiled[digest] = compiled
+    return compiled
+
+
+def load_rules(path=RULES_FILE, cache_dir=RULES_CACHE_DIR):
+    """Read, validate and compile a rules file"""
+    return compile_rules(validate_rules(read_rules(path), os.path.basename(path)), cache_dir)
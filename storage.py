@@ -0,0 +1,252 @@
+# Table input/output for the LinkedIn Jobs pipeline: Excel, CSV, Parquet and Arrow
+import os
+import warnings
+
+import pandas as pd
+
+from pipeline import fingerprint_input
+
+# Low-cardinality label columns, stored as categoricals
+CATEGORICAL_COLUMNS = ['Regions', 'industry_cat', 'job_type', 'company_size', 'level', 'city']
+
+# Where Excel workbooks are cached once converted to Parquet
+EXCEL_CACHE_DIR = '.excel_cache'
+
+# Rows per Parquet row group, the unit index.PostingIndex.fetch reads
+ROW_GROUP_SIZE = 16_384
+
+PARQUET_EXTENSIONS = ('.parquet', '.pq')
+ARROW_EXTENSIONS = ('.arrow', '.feather')
+EXCEL_EXTENSIONS = ('.xlsx', '.xlsm', '.xls')
+
+
+def _require_pyarrow():
+    try:
+        import pyarrow
+    except ImportError:
+        raise ImportError('Parquet/Arrow support needs pyarrow: pip install pyarrow') from None
+    return pyarrow
+
+
+def table_format(path):
+    """Return 'parquet', 'arrow', 'excel' or 'csv' from a file extension"""
+    ext = os.path.splitext(str(path))[1].lower()
+    if ext in PARQUET_EXTENSIONS:
+        return 'parquet'
+    if ext in ARROW_EXTENSIONS:
+        return 'arrow'
+    if ext in EXCEL_EXTENSIONS:
+        return 'excel'
+    if ext == '.csv':
+        return 'csv'
+    raise ValueError(f'Unsupported table format: {path}')
+
+
+def to_categoricals(df, columns=CATEGORICAL_COLUMNS):
+    """Convert the low-cardinality label columns present in df to categoricals"""
+    for column in columns:
+        if column in df.columns and not isinstance(df[column].dtype, pd.CategoricalDtype):
+            df[column] = df[column].astype('category')
+    return df
+
+
+def _excel_cache_path(path, cache_dir):
+    name = os.path.splitext(os.path.basename(str(path)))[0]
+    return os.path.join(cache_dir, f'{name}-{fingerprint_input(path)}.parquet')
+
+
+def excel_to_parquet(path, cache_dir=EXCEL_CACHE_DIR):
+    """Convert a workbook to Parquet once and return the path of the cached copy
+
+    The cached file is named after the workbook's content hash, so editing
+    the workbook triggers a new conversion. Returns None when the sheet holds
+    values Arrow cannot store (e.g. a column mixing numbers and text).
+    """
+    _require_pyarrow()
+    cached = _excel_cache_path(path, cache_dir)
+    if os.path.exists(cached):
+        return cached
+
+    df = pd.read_excel(path)
+    os.makedirs(cache_dir, exist_ok=True)
+    try:
+        df.to_parquet(cached + '.tmp', index=False)
+    except (TypeError, ValueError) as e:
+        warnings.warn(f'Cannot cache {path} as Parquet: {e}')
+        if os.path.exists(cached + '.tmp'):
+            os.remove(cached + '.tmp')
+        return None
+    os.replace(cached + '.tmp', cached)
+    return cached
+
+
+def read_table(path, columns=None, excel_cache_dir=EXCEL_CACHE_DIR, categoricals=True):
+    """Read a table from Parquet, Arrow/Feather, CSV or Excel
+
+    Excel workbooks go through the Parquet conversion cache when pyarrow is
+    installed and excel_cache_dir is set, so only the first read pays for
+    openpyxl. Label columns come back as categoricals whatever the format.
+    """
+    fmt = table_format(path)
+    if fmt == 'excel':
+        cached = None
+        if excel_cache_dir:
+            try:
+                cached = excel_to_parquet(path, excel_cache_dir)
+            except ImportError:
+                pass
+        if cached is None:
+            df = pd.read_excel(path, usecols=columns)
+        else:
+            path, fmt = cached, 'parquet'
+
+    if fmt == 'parquet':
+        _require_pyarrow()
+        df = pd.read_parquet(path, columns=columns)
+    elif fmt == 'arrow':
+        _require_pyarrow()
+        df = pd.read_feather(path, columns=columns)
+    elif fmt == 'csv':
+        df = pd.read_csv(path, usecols=columns)
+        if 'date' in df.columns:
+            df['date'] = pd.to_datetime(df['date'])
+    return to_categoricals(df) if categoricals else df
+
+
+def write_table(df, path):
+    """Write a table to Parquet, Arrow/Feather or CSV, label columns as categoricals"""
+    fmt = table_format(path)
+    if fmt == 'csv':
+        df.to_csv(path, index=False)
+        return
+    if fmt == 'excel':
+        raise ValueError('Writing Excel output is not supported; use Parquet or CSV')
+
+    _require_pyarrow()
+    df = to_categoricals(df.copy())
+    if fmt == 'parquet':
+        df.to_parquet(path, index=False, row_group_size=ROW_GROUP_SIZE)
+    else:
+        df.reset_index(drop=True).to_feather(path)
+
+
+def read_chunks(path, chunksize, excel_cache_dir=EXCEL_CACHE_DIR):
+    """Yield a table as DataFrames of at most chunksize rows
+
+    A workbook that has already been converted to Parquet is read from the
+    cached copy; otherwise its rows are streamed with openpyxl, since a full
+    conversion would load the whole sheet into memory.
+    """
+    fmt = table_format(path)
+    if fmt == 'excel' and excel_cache_dir:
+        cached = _excel_cache_path(path, excel_cache_dir)
+        if os.path.exists(cached):
+            path, fmt = cached, 'parquet'
+
+    if fmt == 'csv':
+        for chunk in pd.read_csv(path, chunksize=chunksize):
+            if 'date' in chunk.columns:
+                chunk['date'] = pd.to_datetime(chunk['date'])
+            yield chunk
+        return
+
+    if fmt == 'parquet':
+        _require_pyarrow()
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunksize):
+            yield batch.to_pandas()
+        return
+
+    if fmt == 'arrow':
+        # Feather files are memory-mapped, so slicing does not load the whole table
+        import pyarrow.feather as feather
+        table = feather.read_table(path, memory_map=True)
+        for start in range(0, table.num_rows, chunksize):
+            yield table.slice(start, chunksize).to_pandas()
+        return
+
+    # openpyxl's read-only mode streams rows without loading the whole sheet
+    from openpyxl import load_workbook
+    workbook = load_workbook(path, read_only=True)
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header = list(next(rows))
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) == chunksize:
+                yield pd.DataFrame(batch, columns=header)
+                batch = []
+        if batch:
+            yield pd.DataFrame(batch, columns=header)
+    finally:
+        workbook.close()
+
+
+class TableWriter:
+    """Append DataFrame chunks to one CSV, Parquet or Arrow file
+
+    Parquet and Arrow chunks are cast to the schema of the first chunk so they
+    land in a single file. Parquet label columns are dictionary-encoded; the
+    Arrow file format cannot change dictionaries between batches, so there
+    they are stored as strings and read_table turns them back into
+    categoricals.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.format = table_format(path)
+        if self.format == 'excel':
+            raise ValueError('Writing Excel output is not supported; use Parquet or CSV')
+        self._writer = None
+        self._schema = None
+        self.rows = 0
+
+    def _arrow_schema(self, table):
+        pa = _require_pyarrow()
+        fields = []
+        for field in table.schema:
+            if field.name in CATEGORICAL_COLUMNS or pa.types.is_dictionary(field.type):
+                if self.format == 'parquet':
+                    field = field.with_type(pa.dictionary(pa.int32(), pa.string()))
+                else:
+                    field = field.with_type(pa.string())
+            elif pa.types.is_null(field.type) or pa.types.is_large_string(field.type):
+                # All-missing object columns have no type yet; text columns share one
+                field = field.with_type(pa.string())
+            fields.append(field)
+        # The pandas metadata carries DataFrame.attrs (e.g. the bitmask labels of compact.py)
+        return pa.schema(fields, metadata=table.schema.metadata)
+
+    def write(self, df):
+        if self.format == 'csv':
+            df.to_csv(self.path, index=False, mode='a' if self.rows else 'w', header=not self.rows)
+            self.rows += len(df)
+            return
+
+        pa = _require_pyarrow()
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        if self._schema is None:
+            self._schema = self._arrow_schema(table)
+            if self.format == 'parquet':
+                import pyarrow.parquet as pq
+                self._writer = pq.ParquetWriter(self.path, self._schema)
+            else:
+                self._writer = pa.ipc.new_file(self.path, self._schema)
+        table = table.select(self._schema.names).cast(self._schema)
+        if self.format == 'parquet':
+            self._writer.write_table(table, row_group_size=ROW_GROUP_SIZE)
+        else:
+            self._writer.write_table(table)
+        self.rows += len(df)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,76 @@
+# Incremental runs must give the same output as a full run over the same postings
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.synthetic import synthetic_postings
+from incremental import KEY_COLUMNS, StateStore
+from memo import memo_cache
+from text_processing import INTERMEDIATE_COLUMNS, build_pipeline, load_postings
+
+ROWS = 200
+
+
+@pytest.fixture(autouse=True)
+def clear_memo():
+    memo_cache.clear()
+    yield
+    memo_cache.clear()
+
+
+def full_run(path, tmp_path):
+    pipeline = build_pipeline(str(tmp_path / 'full.csv'), cache_dir=None, verbose=False)
+    return pipeline.run(path)
+
+
+def incremental_run(paths, tmp_path):
+    store = StateStore.open(str(tmp_path / 'state'))
+    for path in paths:
+        store.update(load_postings(path))
+        store.save()
+        store = StateStore.open(str(tmp_path / 'state'))
+    return store.output().drop(columns=INTERMEDIATE_COLUMNS)
+
+
+def same_rows(left, right):
+    order = KEY_COLUMNS + ['description']
+    left = left.sort_values(order).reset_index(drop=True)
+    right = right[left.columns].sort_values(order).reset_index(drop=True)
+    pd.testing.assert_frame_equal(left, right, check_dtype=False)
+
+
+@pytest.fixture
+def postings():
+    """Synthetic postings with two distinct postings sharing the key columns"""
+    df = synthetic_postings(ROWS, seed=7)
+    twin = df.iloc[[110]].copy()
+    twin['description'] = 'Second opening for the same role. Python and SQL, 3+ years, full-time.'
+    return pd.concat([df, twin], ignore_index=True)
+
+
+def test_same_key_rows_are_all_kept(postings, tmp_path):
+    path = tmp_path / 'postings.csv'
+    postings.to_csv(path, index=False)
+    full = full_run(str(path), tmp_path)
+    incremental = incremental_run([str(path)], tmp_path)
+    assert len(incremental) == len(full)
+    same_rows(incremental, full)
+
+
+def test_batches_match_full_run(postings, tmp_path):
+    first, second = tmp_path / 'first.csv', tmp_path / 'second.csv'
+    postings.iloc[:120].to_csv(first, index=False)
+
+    # The second batch repeats postings 100-119, one of them now listed with a same-key twin, and
+    # changes the twin; a batch replaces every stored row of the keys it lists
+    changed = postings.iloc[100:].copy()
+    changed.loc[changed.index[-1], 'description'] += ' Remote work possible.'
+    changed.to_csv(second, index=False)
+    everything = tmp_path / 'all.csv'
+    pd.concat([postings.iloc[:100], changed]).to_csv(everything, index=False)
+
+    same_rows(incremental_run([str(first), str(second)], tmp_path), full_run(str(everything), tmp_path))
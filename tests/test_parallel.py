@@ -0,0 +1,52 @@
+# Parallel and serial runs of the extractors must give identical output
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import parallel
+from benchmarks.synthetic import synthetic_postings
+from extraction import extract_fields
+from memo import memo_cache
+from parallel import map_rows, map_shards, apply_each
+from text_processing import (add_date_parts, clean_industries, clean_locations, extract_features,
+                             normalize_descriptions, remove_fluff)
+
+ROWS = 400
+
+
+@pytest.fixture(autouse=True)
+def small_shards(monkeypatch):
+    # Shards of a few rows, so a test-sized input still goes through the pool
+    monkeypatch.setattr(parallel, 'MIN_SHARD_SIZE', 10)
+    memo_cache.clear()
+    yield
+    memo_cache.clear()
+
+
+@pytest.fixture(scope='module')
+def cleaned():
+    """Synthetic postings cleaned up to the extraction stage"""
+    df = synthetic_postings(ROWS, seed=4)
+    for step in (add_date_parts, clean_locations, clean_industries, normalize_descriptions, remove_fluff):
+        df = step(df)
+    return df
+
+
+def test_map_shards_matches_serial(cleaned):
+    values = cleaned['description'].tolist()
+    serial = map_shards(lambda shard: apply_each(extract_fields, shard), values, workers=1)
+    pooled = map_rows(extract_fields, values, workers=4)
+    # Compared as frames: a NaN unpickled from a worker is not == the serial one
+    pd.testing.assert_frame_equal(pd.DataFrame(pooled), pd.DataFrame(serial))
+
+
+def test_extract_features_matches_serial(cleaned):
+    serial = extract_features(cleaned.copy(), workers=1)
+    # Without clearing the memo, the second run would be served from the first run's results
+    memo_cache.clear()
+    pooled = extract_features(cleaned.copy(), workers=4)
+    pd.testing.assert_frame_equal(pooled, serial)
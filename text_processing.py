@@ -1,120 +1,33 @@
 # Import packages
 import numpy as np
 import pandas as pd
-import seaborn as sns
-import matplotlib.pyplot as plt
-import pickle
 import warnings
-import re
+import os
+import argparse
+import tempfile
+from collections import Counter
+from normalizer import spec_chars, replace_spec_chars, remove_spec_chars, normalize_text, NON_ALNUM
+from keywords import keyword_groups, industry_pattern, industry_aliases, compiled_rules
+from extraction import degree_codes, rem_fluff, extract_fields
+from memo import memo_map, memo_cache
+from pipeline import Pipeline, Stage, fingerprint_code
+from instrumentation import instrumentation, instrumented
+from storage import read_table, write_table, read_chunks, TableWriter
+from regions import region_resolver, load_region_rules, RegionResolver
+from compact import compact_frame, add_savings, print_savings
+from index import IndexBuilder, build_index
+from rollup import Rollup
+from quality import QualityFilter, quality_signals, word_counts, DEFAULT_RULES
+from dedup import (NearDuplicates, mix64, shingle_hashes, bucket_pairs, unique_pairs, merge_sorted,
+                   connected_components, THRESHOLD as DEDUP_THRESHOLD)
 warnings.filterwarnings('ignore')
 
-# Load the dataset
-df = pd.read_excel('Linkedin Job Posts in Saudi Arabia 2020.xlsx')
-
-# Define special characters to remove from dataset
-spec_chars = ["!", '"', "#", "%", "&", "'", "(", ")",
-              "*", "+", ",", "-", ".", "/", ":", ";", "<",
-              "=", ">", "?", "@", "[", "\\", "]", "^", "_",
-              "`", "{", "|", "}", "~", "–"]
-
-# Extract date components
-df['day'] = df['date'].dt.day
-df['month'] = df['date'].dt.month
-df['quarter'] = df['date'].dt.quarter
-
-# Clean location data by removing special characters
-for char in spec_chars:
-    df['location'] = df['location'].str.replace(char, ' ')
-
-# Extract first word from location column as city
-df['city'] = df['location'].str.split(' ').str[0]
-
-print(f"Unique cities: {df['city'].nunique()}")
-
-# Convert blank space to null values
-df['city'] = df['city'].replace(r'', np.nan)
-
-# Fill null values
-df['city'] = df['city'].fillna('NotDefined')
-
-for char in spec_chars:
-    df['city'] = df['city'].str.replace(char, '')
-
-print(f"Cities after cleaning: {df['city'].nunique()}")
-
-# Add new column region - extract first word from city column
-df['Regions'] = df['city'].str.split(' ').str[0]
-
-df.loc[df['Regions'].str.contains('Jeddah|Makkah|Rabigh|Taif|Thuwal|Dhahban|AlKhurmah|AlLith'), 'Regions'] = 'Makkah'
-df.loc[df['Regions'].str.contains('Riyadh|AlKharj|AlHair|AlMajma|AlDuwadimi|AlQuwayiyah|Shaqra|AlAflaj|Afif|AlDiriyah|Huraymila|Zulfi|UmmalHamam'), 'Regions'] = 'Riyadh'
-df.loc[df['Regions'].str.contains('Dammam|AlKhobar|Alsharqiyah|Jubail|Dhahran|Khobar|RasTanura|Abqaiq|Qatif|AlHufuf|Ahsa|Safwa|Khafji|Harad|Umm_al-Hamam|Saihat|AlMubarraz|HafarAlbatin'), 'Regions'] = 'Eastern'
-df.loc[df['Regions'].str.contains('Khamis_Mushait|Abha|AlMajardah|MahayelAseer|AlFarah|Balqarn|Bisha|SaratUbaida|AlNamas|KhamisMushait'), 'Regions'] = 'Asir'
-df.loc[df['Regions'].str.contains('Jazan|AlShuqaiq|Baysh'), 'Regions'] = 'Jazan'
-df.loc[df['Regions'].str.contains('Madinah|Yanbu|Badr|Hinakiyah|Al-Ula|AlUla'), 'Regions'] = 'Medina'
-df.loc[df['Regions'].str.contains('Buraydah|AlQassim|AlMuthneb|Albadai|Albukairyah|Unayzah'), 'Regions'] = 'AlQassim'
-df.loc[df['Regions'].str.contains('Tabuk|AlWajh|Neom|Duba'), 'Regions'] = 'Tabuk'
-df.loc[df['Regions'].str.contains('Hail'), 'Regions'] = 'Hail'
-df.loc[df['Regions'].str.contains('Najran|Sharorah|Yadma'), 'Regions'] = 'Najran'
-df.loc[df['Regions'].str.contains('Sakakah|Qurayyat|DumatAlJandal'), 'Regions'] = 'AlJawf'
-df.loc[df['Regions'].str.contains('AlBahah|AlAin'), 'Regions'] = 'AlBahah'
-df.loc[df['Regions'].str.contains('Turaif|Rafha|Arar'), 'Regions'] = 'Northern Borders'
-df.loc[df['Regions'].str.contains('NotDefined'), 'Regions'] = 'NotDefind'
-df.loc[df['Regions'].str.contains('Remote|LeMéridien'), 'Regions'] = 'Remote'
-
-pd.options.display.max_rows = 4000
-print(f"Regions distribution: {df['Regions'].nunique()} unique regions")
-
-for char in spec_chars:
-    df['industries'] = df['industries'].str.replace(char, '')
-
-# Replace blank space column to null values
-df['industries'] = df['industries'].replace(r'', np.nan)
-
-# Drop null values
-df = df.dropna(subset=['industries'])
-
-print(f"Industries unique count: {df.industries.nunique()}")
-
-# Extract industry categories
-df['industry_cat'] = df['industries'].str.extract(
-    r'(Administrative|Business Supplies and Equipment|Chemicals|Business Development|Building Materials|Capital Markets|Banking|Aviation|Biotechnology|Broadcast Media|Automotive|Arts and Crafts|Architecture|Apparel|Animation|Accounting|Market Research|Oil|Insurance|Hospitality|Food Production|Food|Information Technology and Services|Hospital|Fashion|Financial Services|Airlines|Civic|Civil Engineering|Commercial Real Estate|Computer|Construction|Consulting|Consumer Electronics|Consumer Goods|Consumer Services|Cosmetics|Customer Service Sales|Dairy|Defense|Design|ELearning|Education|Electrical|Entertainment|Environmental Services|Events Services|Executive Services|Facilities Services|Farming|Fine Art|Furniture|Graphic Design|Glass Ceramics|Government Administration|Government Relations|Human Resources|Health Care Provider|Individual|Information Services|Internet|Investment|Law|Legal Service|Leisure Travel|Logistic and Supply Chain|Luxury Goods|Machinery|Marketing and Advertising|Management Consulting|Media|Medical|Mental Health Care|Military|Mobile Game|Music|Museums|Nanotechnology|Newspapers|Online Media|Real Estate|Security|Retail|Sports|Supermarkets|Telecommunication|Writing|Warehousing|Utilites|Venture Capital|Wholesale|Sporting Goods|Research|Publishing|Public Safety|Public Policy|Public Relations|Photography|Packaging and Containers|Quality Assurance|Purchasing Supply Chain|Outsourcing|Pharmaceuticals|Plastics|Training|Motion Pictures|International Trade|International Affairs|Import and Export|Industrial Automation|Maritime|Mechanical|Program Development|Project Management|Mining|Philanthropy|Printing|Transportation|Restaurants|Health Wellness and Fitness|Paper|Higher Education|Renewables|Semiconductors|Staffing and Recruiting|Textiles|Tobacco|Translation and Localization|Veterinary|Alternative Dispute Resolution|Analyst)')
-
-print(df['industry_cat'].value_counts())
-
-# Drop null values
-df = df.dropna(subset=['industry_cat'])
-
-print(df['industry_cat'].unique())
-
-# Replace blank space column to null values
-df['industry_cat'] = df['industry_cat'].replace(r'', np.nan)
-
-# Define function to remove unwanted characters
-def remove_unwanted_characters(s):
-    s = re.sub('\\*', ' ', str(s))
-    s = re.sub('/', ' ', str(s))
-    s = re.sub('_', ' ', str(s))
-    s = re.sub('\\?', ' ', str(s))
-    s = re.sub('%', ' ', str(s))
-    s = re.sub('@', ' ', str(s))
-    s = re.sub('#', ' ', str(s))
-    s = re.sub('!', ' ', str(s))
-    s = re.sub(',', ' ',str(s))
-    s = re.sub('\\+', ' ', str(s))
-    s = re.sub('&', ' ', str(s))
-    return s
-
-# Remove common text in job description
-def rem_fluff(data):
-    data = data.replace('please share resume', " ")
-    data = data.replace('call me', " ")
-    data = data.replace('if you are a', " ")
-    data = data.replace('if you are an', " ")
-    data = data.replace('job description', " ")
-    data = data.replace('if you are', " ")
-    data = data.replace('reply', " ")
-    data = data.replace("please apply today applicants must be authorized to work in the u.s.please apply directly to by clicking 'click here to apply' with your word resume looking forward to receiving your resume and going over the position in more detail with you.- not a fit for this position click the link at the bottom of this email to search all of our open positions.looking forward to receiving your resume cybercoderscybercoders inc is proud to be an equal opportunity employerall qualified applicants will receive consideration for employment without regard to race color religion sex national origin disability protected veteran status or any other characteristic protected by law.your right to work - in compliance with federal law all persons hired will be required to verify identity and eligibility to work in the united states and to complete the required employment eligibility verification document form upon hire.copyright  - . cybercoders inc. all rights reserved.", ' ')
-    return data
+INPUT_FILE = 'Linkedin Job Posts in Saudi Arabia 2020.xlsx'
+OUTPUT_FILE = 'data_jobs.parquet'
+CACHE_DIR = '.pipeline_cache'
+
+# Columns produced along the way that are not exported
+INTERMEDIATE_COLUMNS = ['degree', 'degree_int', 'years_of_ex']
 
 # function to get rid of repeated skills after a '-'
 def split_skills(data):
@@ -131,245 +44,577 @@ def split_skills(data):
         else:
             return x
 
-def drop_corrupt_rows(df):
-    df['word_count'] = df['description'].map(lambda x: len(x.split()))
-
-    mean_word_count = df['word_count'].mean()
-    print('Mean word count per post:', round(mean_word_count))
-
-    std_word_count = df['word_count'].std()
-    print('std word count per post:', round(std_word_count))
-
-    too_short = mean_word_count - 1.5*std_word_count
-    too_short = 20
-
-    # Drop posts with 20 word or less
-    print(len(df), 'before dropping')
-    mask = df['word_count'] > too_short
-    df = df[mask]
-    print(len(df), 'after dropping')
-
-    df.drop(columns='word_count', inplace=True)
-
-    return df.reset_index(drop=True)
-
-# Remove unwanted characters and numbers
-df['description'] = df['description'].map(remove_unwanted_characters)
-df['industries'] = df['industries'].map(remove_unwanted_characters)
-
-# Correct multiple spaces (including \t and \n)
-df['description'] = df['description'].map(lambda x: re.sub(r'[^a-zA-Z0-9]',' ', x))
-df['industries'] = df['industries'].map(lambda x: re.sub(r'[^a-zA-Z0-9]',' ', x))
-
-# Drop corrupted rows
-df = drop_corrupt_rows(df)
-
-# Remove common phrases
-df['description'] = df['description'].map(rem_fluff)
-df['industries'] = df['industries'].map(rem_fluff)
-
-df['description'] = df['description'].str.lower()
-
-#Number of unique entries were found for each columns.
-df.apply(pd.Series.nunique)
-
-df[['description']]= df[['description']].dropna()
-
-def years_of_ex(description):
-    if description != np.nan:
-        description = description.lower()
-        match = re.search('[^0-9]\\+ years|[^0-9]\\+ year|[0-9] [0-9]\\+ years|[0-9] [0-9]\\+ year|\\+[0-9]|[0-9] to [0-9] year|[0-9] to [0-9] years|[0-9] to [0-9] yrs|[0-9] [0-9] yrs|[^0-9] +year|[0-9] +years|..\\+ yrs|[0-9] [0-9] +years|entry|junior', description)
-        if match != None:
-            return description[match.start(): match.end()]
-    return np.nan
-
-df['years_of_ex'] = df['description'].apply(years_of_ex)
-print(df['years_of_ex'].isnull().sum())
-
-# Extract numbers
-df['year_of_ex']=df['years_of_ex'].str.extract('(\\d)')
+class RunningMoments:
+    """Count, sum and sum of squares of a numeric column, accumulated over chunks"""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.total_sq = 0.0
+
+    def update(self, values):
+        values = values.astype(float)
+        self.count += len(values)
+        self.total += values.sum()
+        self.total_sq += (values ** 2).sum()
+
+    def remove(self, values):
+        """Take back values passed to update earlier"""
+        values = values.astype(float)
+        self.count -= len(values)
+        self.total -= values.sum()
+        self.total_sq -= (values ** 2).sum()
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else np.nan
+
+    @property
+    def std(self):
+        # Sample standard deviation, as pandas computes it
+        if self.count < 2:
+            return np.nan
+        variance = (self.total_sq - self.total ** 2 / self.count) / (self.count - 1)
+        return np.sqrt(max(variance, 0.0))
+
+@instrumented
+def drop_corrupt_rows(df, moments=None, quality=None):
+    """Drop posts failing the quality rules of quality.py (by default, 20 words or fewer)"""
+    quality = QualityFilter() if quality is None else quality
+    signals = quality_signals(df['description'])
+
+    if moments is not None:
+        # Chunked run: the caller reports mean and std over the whole input
+        moments.update(signals['words'])
+    else:
+        mean_word_count = signals['words'].mean()
+        print('Mean word count per post:', round(mean_word_count))
 
-#change data type to calculate the mean
-df['year_of_ex'] = df['year_of_ex'].astype(float)
+        std_word_count = signals['words'].std()
+        print('std word count per post:', round(std_word_count))
 
-#calculate the mean of experience according to level grouping
-years=df.groupby('level').agg(years_of_ex = ('year_of_ex', 'mean'))
+    if moments is None:
+        print(len(df), 'before dropping')
+    df = quality.apply(df, signals, moments)
+    if moments is None:
+        print(len(df), 'after dropping')
 
-#fill null values with mean
-df['year_of_ex']=df['year_of_ex'].fillna(df.groupby('level')['year_of_ex'].transform('mean'))
+    return df
 
-# Fill any remaining NaN values with 0
-df['year_of_ex'] = df['year_of_ex'].fillna(0)
+@instrumented
+def add_date_parts(df):
+    """Extract date components"""
+    df['day'] = df['date'].dt.day
+    df['month'] = df['date'].dt.month
+    df['quarter'] = df['date'].dt.quarter
+    return df
 
-#convert years_experience from float to int
-df['year_of_ex'] = df['year_of_ex'].astype(int)
+@instrumented
+def clean_locations(df, verbose=False):
+    """Clean location data, extract the city and map it to a region"""
+    # Clean location data by removing special characters
+    df['location'] = replace_spec_chars(df['location'])
 
-#remove stopword from description
-spec_char=["in","or","and","from","is","a","that","with","at","of"]
-for chars in spec_char:
-    df['description'] = df['description'].str.replace(chars, '')
+    # Extract first word from location column as city
+    df['city'] = df['location'].str.split(' ').str[0]
 
-def degree(description):
-    if description != np.nan:
-        description = description.lower()
-        match = re.search(r'bachelor|master|masters| ms | bs | phd | msc |university|technicl degree|mster|bchel|bchels|msters|diplom| hve |needbchels|experiencebchels|requirementsbchels|college|qulifictionsbchels|electricl |undergrdute|grdute|mechnicl', description)
-        if match != None:
-            return description[match.start(): match.end()]
-    return np.nan
+    if verbose:
+        print(f"Unique cities: {df['city'].nunique()}")
 
-df['degree'] = df['description'].apply(degree)
-print(df['degree'].isnull().sum())
+    # Convert blank space to null values
+    df['city'] = df['city'].replace(r'', np.nan)
 
-df['degree'] = df['degree'].str.replace(' ','')
+    # Fill null values
+    df['city'] = df['city'].fillna('NotDefined')
 
-df['degree'] = df['degree'].str.replace('undergrdute','student')
+    df['city'] = remove_spec_chars(df['city'])
 
-#bachelor
-df['degree'] = df['degree'].str.replace('needbchels','bachelor')
-df['degree'] = df['degree'].str.replace('experiencebchels','bachelor')
-df['degree'] = df['degree'].str.replace('requirementsbchels','bachelor')
-df['degree'] = df['degree'].str.replace('qulifictionsbchels','bachelor')
+    if verbose:
+        print(f"Cities after cleaning: {df['city'].nunique()}")
 
-bachelor1=["bchel","bs","grdute","college","university"]
-for chars12 in bachelor1:
-    df['degree'] = df['degree'].str.replace(chars12,'bachelor')
-
-#master
-master1=["master","msc","masters","ms","mster","msters","masterter"," master"]
-for chars1 in master1:
-    df['degree'] = df['degree'].str.replace(chars1,'master')
-
-#diploma
-diploma1=["technicldegree","electricl","mechnicl"]
-for chars11 in diploma1:
-    df['degree'] = df['degree'].str.replace(chars11,'diplom')
-
-#phd
-df['degree'] = df['degree'].str.replace('phd','Doctorate')
-
-#hve
-df['degree'] = df['degree'].str.replace('hve','Higher Vocational Education')
-
-#change diplom to diploma
-df['degree'] = df['degree'].str.replace('diplom','diploma')
-
-df['degree_int']=df['degree'].str.extract('(Higher Vocational Education|bachelor|diploma|master|student|Doctorate)')
-
-# add new column extracting values from degree and replace it with numbers to calculate the mean and fill null values with it
-df['degree_int'] = df['degree_int'].str.replace('Higher Vocational Education','1')
-df['degree_int'] = df['degree_int'].str.replace('bachelor','2')
-df['degree_int'] = df['degree_int'].str.replace('diploma','3')
-df['degree_int'] = df['degree_int'].str.replace('master','4')
-df['degree_int'] = df['degree_int'].str.replace('student','5')
-df['degree_int'] = df['degree_int'].str.replace('Doctorate','6')
-
-df['degree_int']=df['degree_int'].replace(r'', np.nan)
-
-#change data type to float to correctly calculate the mean
-df['degree_int'] = df['degree_int'].astype(float)
-
-df['degree_int']=df['degree_int'].fillna(df.groupby('level')['degree_int'].transform('mean'))
-
-# Fill any remaining NaN values with 2 (bachelor level)
-df['degree_int'] = df['degree_int'].fillna(2)
-
-#convert float to int
-df['degree_int'] = df['degree_int'].astype(int)
-
-#convert float to int
-df['degree_int'] = df['degree_int'].astype(str)
-
-#replace the numbers back to string
-df['degree_int'] = df['degree_int'].replace('1','Higher Vocational Education')
-df['degree_int'] = df['degree_int'].replace('2','bachelor')
-df['degree_int'] = df['degree_int'].replace('3','diploma')
-df['degree_int'] = df['degree_int'].replace('4','master')
-df['degree_int'] = df['degree_int'].replace('5','student')
-df['degree_int'] = df['degree_int'].replace('6','Doctorate')
-
-# Extract salary information
-def extract_salary(description):
-    if description != np.nan:
-        description = description.lower()
-        match = re.search(r'\\d+[,\\d]*\\s*(?:sar|riyal|sr|salary|k|thousand)', description)
-        if match:
-            return match.group()
-    return np.nan
-
-df['salary_mentioned'] = df['description'].apply(extract_salary)
-
-# Extract common skills
-def extract_skills(description):
-    if description != np.nan:
-        skills = []
-        skill_patterns = ['python', 'java', 'sql', 'excel', 'powerbi', 'tableau', 'aws', 'azure', 'docker', 'react', 'nodejs', 'machine learning', 'data analysis']
-        for skill in skill_patterns:
-            if skill in description.lower():
-                skills.append(skill)
-        return ', '.join(skills) if skills else np.nan
-    return np.nan
-
-df['skills'] = df['description'].apply(extract_skills)
-
-# Extract job type
-def extract_job_type(description):
-    if pd.isna(description):
-        return 'Not Specified'
-    
-    description = description.lower()
-    if any(word in description for word in ['full time', 'full-time', 'permanent']):
-        return 'Full-time'
-    elif any(word in description for word in ['part time', 'part-time']):
-        return 'Part-time'
-    elif any(word in description for word in ['contract', 'contractor', 'freelance']):
-        return 'Contract'
-    elif any(word in description for word in ['intern', 'internship', 'trainee']):
-        return 'Internship'
-    else:
-        return 'Not Specified'
-
-df['job_type'] = df['description'].apply(extract_job_type)
-
-# Extract company size
-def extract_company_size(description):
-    if pd.isna(description):
-        return 'Unknown'
-    
-    description = description.lower()
-    if any(word in description for word in ['startup', 'small company', 'growing team']):
-        return 'Small'
-    elif any(word in description for word in ['medium', 'established', '100+ employees']):
-        return 'Medium'
-    elif any(word in description for word in ['large', 'multinational', 'global', 'fortune', '1000+ employees']):
-        return 'Large'
-    else:
-        return 'Unknown'
-
-df['company_size'] = df['description'].apply(extract_company_size)
-
-# Add useful metrics
-df['description_length'] = df['description'].str.len()
-df['is_remote'] = df['Regions'].str.contains('Remote').astype(int)
-
-print(f"\\nFinal dataset info:")
-print(f"Shape: {df.shape}")
-print(f"Null values:\\n{df.isnull().sum()}")
-
-print("\\n=== DATA SUMMARY ===")
-print(f"Total jobs: {len(df):,}")
-print(f"Jobs with salary info: {df['salary_mentioned'].notna().sum()}")
-print(f"Jobs with skills: {df['skills'].notna().sum()}")
-print(f"Remote jobs: {df['is_remote'].sum():,}")
-print(f"Job types: {df['job_type'].value_counts().to_dict()}")
-print(f"Company sizes: {df['company_size'].value_counts().to_dict()}")
-
-#drop unneeded columns
-df= df.drop(['degree'], axis=1)
-df= df.drop(['degree_int'], axis=1)
-df= df.drop(['years_of_ex'], axis=1)
-
-# Export to CSV
-df.to_csv('data_jobs.csv', index=False)
-print("\\nProcessed data saved to 'data_jobs.csv'")
-print(f"Final dataset shape: {df.shape}")
-print(f"Final columns: {list(df.columns)}")
\ No newline at end of file
+    # Add new column region - extract first word from city column
+    df['Regions'] = df['city'].str.split(' ').str[0]
+
+    # Map cities to regions with the table in config/regions.json
+    with instrumentation.step('regions', df) as step:
+        df['Regions'] = step.output(region_resolver().resolve_series(df['Regions']))
+
+    if verbose:
+        print(f"Regions distribution: {df['Regions'].nunique()} unique regions")
+    return df
+
+@instrumented
+def clean_industries(df, verbose=False):
+    """Clean industries and extract the industry category, dropping rows without one"""
+    df['industries'] = remove_spec_chars(df['industries'])
+
+    # Replace blank space column to null values
+    df['industries'] = df['industries'].replace(r'', np.nan)
+
+    # Drop null values
+    df = df.dropna(subset=['industries'])
+
+    if verbose:
+        print(f"Industries unique count: {df.industries.nunique()}")
+
+    # Extract industry categories
+    df['industry_cat'] = df['industries'].str.extract(industry_pattern)
+    if industry_aliases:
+        df['industry_cat'] = df['industry_cat'].replace(industry_aliases)
+
+    if verbose:
+        print(df['industry_cat'].value_counts())
+
+    # Drop null values
+    df = df.dropna(subset=['industry_cat'])
+
+    if verbose:
+        print(df['industry_cat'].unique())
+
+    # Replace blank space column to null values
+    df['industry_cat'] = df['industry_cat'].replace(r'', np.nan)
+    return df
+
+@instrumented
+def normalize_descriptions(df):
+    """Remove unwanted characters from description and industries"""
+    # Remove unwanted characters and replace everything that is not a letter or
+    # a digit (including \t and \n) with a space, in a single pass per column
+    df['description'] = memo_map(df['description'], normalize_text)
+    df['industries'] = memo_map(df['industries'], normalize_text)
+    return df
+
+@instrumented
+def remove_fluff(df):
+    """Remove common phrases and lowercase the description"""
+    # Remove common phrases
+    df['description'] = memo_map(df['description'], rem_fluff)
+    df['industries'] = memo_map(df['industries'], rem_fluff)
+
+    df['description'] = df['description'].str.lower()
+
+    df[['description']]= df[['description']].dropna()
+    return df
+
+@instrumented
+def extract_features(df, workers=1):
+    """Run the per-row extractors in one pass, across a process pool when workers > 1
+
+    Each distinct description is processed once. Missing experience and
+    degree values are imputed later by level.
+    """
+    rows = memo_map(df['description'], extract_fields, workers=workers).tolist()
+    fields = list(zip(*rows)) if rows else [()] * 9
+
+    def column(values, dtype=object):
+        # object dtype keeps the .str accessor usable when no row matches
+        return pd.Series(values, index=df.index, dtype=dtype)
+
+    df['years_of_ex'] = column(fields[0])
+    df['year_of_ex'] = column(fields[1], float)
+
+    #remove stopword from description
+    df['description'] = column(fields[2])
+
+    df['degree'] = column(fields[3])
+    df['degree_int'] = column(fields[4], float)
+
+    df['salary_mentioned'] = column(fields[5])
+    df['skills'] = column(fields[6])
+    df['job_type'] = column(fields[7])
+    df['company_size'] = column(fields[8])
+    return add_metrics(df)
+
+@instrumented
+def add_metrics(df):
+    """Add useful metrics"""
+    df['description_length'] = df['description'].str.len()
+    df['is_remote'] = df['Regions'].str.contains('Remote').astype(int)
+    return df
+
+@instrumented
+def process_chunk(df, moments=None, verbose=False, workers=1, quality=None, near_duplicates=None):
+    """Run every row-local cleaning and extraction stage on a frame or chunk"""
+    df = add_date_parts(df)
+    df = clean_locations(df, verbose)
+    df = clean_industries(df, verbose)
+    df = normalize_descriptions(df)
+    df = drop_corrupt_rows(df, moments, quality)
+    df = remove_fluff(df)
+    if near_duplicates is not None:
+        df = cluster_near_duplicates(df, near_duplicates)
+    df = extract_features(df, workers)
+    return df
+
+@instrumented
+def cluster_near_duplicates(df, near_duplicates):
+    """Add cluster_id and is_canonical from the cleaned descriptions (see dedup.py)"""
+    return near_duplicates.assign(df)
+
+def level_aggregates(df, columns=('year_of_ex', 'degree_int')):
+    """Per-level sums and counts of the values that are imputed by level mean
+
+    Sums and counts of chunks can be added together, so the means over the
+    whole input are known before any chunk is imputed.
+    """
+    grouped = df.groupby('level')[list(columns)]
+    return grouped.sum().join(grouped.count(), lsuffix='_sum', rsuffix='_count')
+
+def merge_aggregates(left, right):
+    """Add two level_aggregates results together"""
+    if left is None:
+        return right
+    return pd.concat([left, right]).groupby(level=0).sum()
+
+def level_means(aggregates, column):
+    counts = aggregates[f'{column}_count']
+    return aggregates[f'{column}_sum'] / counts.where(counts > 0)
+
+@instrumented
+def impute_experience(df, aggregates):
+    """Fill missing years of experience with the mean of the posting's level"""
+    #fill null values with mean
+    df['year_of_ex']=df['year_of_ex'].fillna(df['level'].map(level_means(aggregates, 'year_of_ex')))
+
+    # Fill any remaining NaN values with 0
+    df['year_of_ex'] = df['year_of_ex'].fillna(0)
+
+    #convert years_experience from float to int
+    df['year_of_ex'] = df['year_of_ex'].astype(int)
+    return df
+
+@instrumented
+def impute_degree(df, aggregates):
+    """Fill missing degrees with the mean degree code of the posting's level"""
+    df['degree_int']=df['degree_int'].fillna(df['level'].map(level_means(aggregates, 'degree_int')))
+
+    # Fill any remaining NaN values with 2 (bachelor level)
+    df['degree_int'] = df['degree_int'].fillna(2)
+
+    #convert float to int and replace the numbers back to string
+    degree_names = {code: name for name, code in degree_codes.items()}
+    df['degree_int'] = df['degree_int'].astype(int).map(degree_names)
+    return df
+
+@instrumented
+def impute_by_level(df, aggregates):
+    """Fill missing experience and degree with the mean of the posting's level"""
+    df = impute_experience(df, aggregates)
+    return impute_degree(df, aggregates)
+
+def summary_counts(df):
+    """Counts reported in the data summary; counts of several chunks can be added"""
+    return {
+        'rows': len(df),
+        'nulls': df.isnull().sum(),
+        'salary': df['salary_mentioned'].notna().sum(),
+        'skills': df['skills'].notna().sum(),
+        'remote': df['is_remote'].sum(),
+        'job_types': Counter(df['job_type'].value_counts().to_dict()),
+        'company_sizes': Counter(df['company_size'].value_counts().to_dict()),
+    }
+
+def merge_summary_counts(left, right):
+    """Add two summary_counts results together"""
+    if left is None:
+        return right
+    return {key: left[key] + right[key] for key in left}
+
+def print_summary(counts, columns):
+    print(f"\nFinal dataset info:")
+    print(f"Shape: {(counts['rows'], len(columns))}")
+    print(f"Null values:\n{counts['nulls']}")
+
+    print("\n=== DATA SUMMARY ===")
+    print(f"Total jobs: {counts['rows']:,}")
+    print(f"Jobs with salary info: {counts['salary']}")
+    print(f"Jobs with skills: {counts['skills']}")
+    print(f"Remote jobs: {counts['remote']:,}")
+    print(f"Job types: {dict(counts['job_types'].most_common())}")
+    print(f"Company sizes: {dict(counts['company_sizes'].most_common())}")
+
+def word_count_moments(input_path, chunksize):
+    """Word-count moments of every description that reaches the corrupt-row filter, read in chunks"""
+    moments = RunningMoments()
+    for chunk in read_chunks(input_path, chunksize):
+        chunk = clean_industries(chunk)
+        moments.update(word_counts(memo_map(chunk['description'], normalize_text)))
+    return moments
+
+def process_streaming(input_path, output_path, chunksize, workers=1, compact=False, description='keep',
+                      index_dir=None, quality_rules=None, dedup_threshold=None, rollup_path=None):
+    """Process the input in fixed-size chunks with bounded memory
+
+    Pass one runs every row-local stage per chunk, spills the result to a
+    temporary file and accumulates the global statistics (word-count moments
+    and per-level sums/counts). Pass two imputes each spilled chunk from the
+    merged statistics and appends it to the output, so the result matches an
+    in-memory run. With compact, each chunk is written in the compact form
+    of compact.py. With index_dir, the written chunks are indexed as well.
+    quality_rules are the rules of quality.QualityFilter. With
+    dedup_threshold, near-duplicate postings are clustered across all chunks.
+    With rollup_path, the rollup of rollup.py is summed over the written chunks.
+    A std_cutoff quality rule needs the word-count moments of the whole
+    input, so they are taken in a pre-pass.
+    """
+    moments = RunningMoments()
+    quality_rules = quality_rules or DEFAULT_RULES
+    quality = QualityFilter(**quality_rules)
+    if quality_rules.get('std_cutoff') is not None:
+        quality.moments = word_count_moments(input_path, chunksize)
+    near_duplicates = NearDuplicates(threshold=dedup_threshold) if dedup_threshold else None
+    index = IndexBuilder() if index_dir else None
+    rollup = Rollup() if rollup_path else None
+    aggregates = None
+    counts = None
+    columns = None
+    savings = None
+
+    with tempfile.TemporaryDirectory(prefix='text_processing_') as spill_dir, TableWriter(output_path) as writer:
+        spilled = []
+        rows_in = 0
+        for i, chunk in enumerate(read_chunks(input_path, chunksize)):
+            rows_in += len(chunk)
+            chunk = process_chunk(chunk, moments, workers=workers, quality=quality,
+                                  near_duplicates=near_duplicates)
+            aggregates = merge_aggregates(aggregates, level_aggregates(chunk))
+            path = os.path.join(spill_dir, f'chunk_{i:06d}.pkl')
+            chunk.to_pickle(path)
+            spilled.append(path)
+
+        print('Mean word count per post:', round(moments.mean))
+        print('std word count per post:', round(moments.std))
+        print(rows_in, 'rows read')
+        quality.print_report()
+        if near_duplicates is not None:
+            near_duplicates.print_report()
+
+        for path in spilled:
+            chunk = impute_by_level(pd.read_pickle(path), aggregates)
+            counts = merge_summary_counts(counts, summary_counts(chunk))
+            chunk = chunk.drop(columns=INTERMEDIATE_COLUMNS)
+            if compact:
+                chunk, report = compact_frame(chunk, description)
+                savings = add_savings(savings, report)
+            with instrumentation.step('write', chunk) as step:
+                writer.write(step.output(chunk))
+            if index is not None:
+                with instrumentation.step('index', chunk):
+                    index.add(chunk)
+            if rollup is not None:
+                with instrumentation.step('rollup', chunk):
+                    rollup.add(chunk)
+            columns = chunk.columns
+            os.remove(path)
+
+    if index is not None:
+        index.save(index_dir, output_path)
+        print(f"Index of {index.rows:,} posts saved to '{index_dir}'")
+    if rollup is not None:
+        rollup.save(rollup_path)
+        print(f"Rollup of {rollup.posts:,} posts saved to '{rollup_path}'")
+    if counts is not None:
+        print_summary(counts, columns)
+    if savings is not None:
+        print_savings(savings)
+    return columns
+
+def load_postings(path):
+    """Load the raw postings from an Excel, CSV, Parquet or Arrow file"""
+    return read_table(path, categoricals=False)
+
+def location_stage(df, verbose=False):
+    """Date components, city and region"""
+    df = add_date_parts(df)
+    return clean_locations(df, verbose)
+
+def corrupt_stage(df, verbose=False, **rules):
+    """Drop corrupt rows by the quality rules, then remove common phrases from the survivors"""
+    quality = QualityFilter(**rules)
+    df = drop_corrupt_rows(df, quality=quality)
+    if verbose:
+        quality.print_report()
+    return remove_fluff(df)
+
+
+def dedup_stage(df, verbose=False, threshold=None):
+    """Cluster near-duplicate descriptions (see dedup.py), if a similarity threshold is given"""
+    if threshold:
+        near_duplicates = NearDuplicates(threshold=threshold)
+        df = cluster_near_duplicates(df, near_duplicates)
+        if verbose:
+            near_duplicates.print_report()
+    return df
+
+def impute_stage(df):
+    """Fill missing experience and degree with the means of each level"""
+    return impute_by_level(df, level_aggregates(df))
+
+def export_stage(df, output_path=OUTPUT_FILE, verbose=True, compact=False, description='keep'):
+    """Print the summary, drop intermediate columns and write the output file"""
+    if verbose:
+        print_summary(summary_counts(df), df.columns)
+
+    #drop unneeded columns
+    df = df.drop(columns=INTERMEDIATE_COLUMNS)
+
+    # Categoricals, small integers and bitmasks instead of object columns
+    if compact:
+        df, report = compact_frame(df, description)
+        if verbose:
+            print_savings(report)
+
+    # Export as Parquet/Arrow (label columns as categoricals) or CSV
+    with instrumentation.step('write', df) as step:
+        write_table(step.output(df), output_path)
+    return df
+
+def index_stage(df, index_dir=None, output_path=OUTPUT_FILE, verbose=True):
+    """Build the inverted index of the exported rows (see index.py), if an index directory is given"""
+    if index_dir:
+        build_index(df, index_dir, output_path)
+        if verbose:
+            print(f"Index of {len(df):,} posts saved to '{index_dir}'")
+    return df
+
+def rollup_stage(df, rollup_path=None, verbose=True):
+    """Save the rollup of the exported rows (see rollup.py), if a rollup file is given"""
+    if rollup_path:
+        with instrumentation.step('rollup', df):
+            rollup = Rollup.from_frame(df)
+        rollup.save(rollup_path)
+        if verbose:
+            print(f"Rollup of {rollup.posts:,} posts in {len(rollup.cells):,} cells saved to '{rollup_path}'")
+    return df
+
+def build_pipeline(output_path=OUTPUT_FILE, cache_dir=CACHE_DIR, workers=1, verbose=True, compact=False,
+                   description='keep', index_dir=None, quality_rules=None, dedup_threshold=None,
+                   rollup_path=None):
+    """The processing steps as named, individually cached pipeline stages
+
+    Each stage is keyed by the code it reaches (see pipeline.code_sources)
+    and the vocabularies it lists, so editing one of them only invalidates
+    the stages that use it and the ones after them.
+    """
+    run = {'workers': workers}
+    show = {'verbose': verbose}
+    return Pipeline([
+        Stage('load', load_postings),
+        Stage('location', location_stage, depends=[add_date_parts, clean_locations, replace_spec_chars,
+                                                   remove_spec_chars, spec_chars, RegionResolver,
+                                                   load_region_rules()], options=show),
+        Stage('industry', clean_industries, depends=[remove_spec_chars, spec_chars, industry_pattern,
+                                                     industry_aliases], options=show),
+        Stage('text', normalize_descriptions, depends=[normalize_text, NON_ALNUM.pattern]),
+        Stage('corrupt', corrupt_stage, depends=[drop_corrupt_rows, remove_fluff, rem_fluff, quality_signals,
+                                                 word_counts, QualityFilter],
+              config=dict(quality_rules or DEFAULT_RULES), options=show),
+        Stage('dedup', dedup_stage, depends=[cluster_near_duplicates, NearDuplicates, mix64, shingle_hashes,
+                                             bucket_pairs, unique_pairs, merge_sorted, connected_components],
+              config={'threshold': dedup_threshold}, options=show, cache=bool(dedup_threshold)),
+        Stage('extract', extract_features, depends=[keyword_groups], options=run),
+        Stage('impute', impute_stage, depends=[degree_codes]),
+        Stage('export', export_stage, options={'output_path': output_path, 'compact': compact,
+                                               'description': description, **show}, cache=False),
+        Stage('index', index_stage, options={'index_dir': index_dir, 'output_path': output_path, **show},
+              cache=False),
+        Stage('rollup', rollup_stage, options={'rollup_path': rollup_path, **show}, cache=False),
+    ], cache_dir=cache_dir, verbose=verbose)
+
+def processing_fingerprint():
+    """Hash of the processing code and rules; results computed by other code are stale"""
+    parts = [stage.fingerprint() for stage in build_pipeline(cache_dir=None, verbose=False).stages]
+    parts += [fingerprint_code(func) for func in (process_chunk, extract_features, extract_fields)]
+    parts.append(compiled_rules.hash)
+    return fingerprint_code(parts)
+
+def run(args):
+    """Process the input, streamed in chunks or through the staged pipeline"""
+    description = 'drop' if args.drop_description else 'keep'
+    rules = {'min_words': args.min_words, 'std_cutoff': args.std_cutoff, 'duplicates': args.drop_duplicates}
+    if args.chunksize > 0:
+        columns = process_streaming(args.input, args.output, args.chunksize, args.workers,
+                                    args.compact, description, args.index, rules, args.near_duplicates, args.rollup)
+        print(f"\nProcessed data saved to '{args.output}'")
+        print(f"Final columns: {list(columns)}")
+        return
+
+    pipeline = build_pipeline(args.output, None if args.no_cache else args.cache_dir, args.workers,
+                              compact=args.compact, description=description, index_dir=args.index,
+                              quality_rules=rules, dedup_threshold=args.near_duplicates,
+                              rollup_path=args.rollup)
+    df = pipeline.run(args.input, until=args.until)
+    if args.until is not None and args.until not in ('export', 'index', 'rollup'):
+        print(f"\nStopped after stage '{args.until}'")
+        return
+
+    print(f"\nProcessed data saved to '{args.output}'")
+    print(f"Final dataset shape: {df.shape}")
+    print(f"Final columns: {list(df.columns)}")
+
+def main():
+    parser = argparse.ArgumentParser(description='Clean and extract features from LinkedIn job posts')
+    parser.add_argument('--input', default=INPUT_FILE, help='Excel, CSV, Parquet or Arrow file with the raw posts')
+    parser.add_argument('--output', default=OUTPUT_FILE,
+                        help='Parquet, Arrow or CSV file to write the processed posts to')
+    parser.add_argument('--chunksize', type=int, default=0,
+                        help='process the input in chunks of this many rows (0 = load it all at once)')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='processes used by the extractors (1 = serial, 0 = one per CPU core)')
+    parser.add_argument('--cache-dir', default=CACHE_DIR,
+                        help='directory holding the cached output of each stage')
+    parser.add_argument('--no-cache', action='store_true', help='recompute every stage')
+    parser.add_argument('--until', help='stop after this stage (e.g. extract)')
+    parser.add_argument('--min-words', type=int, default=DEFAULT_RULES['min_words'],
+                        help='drop posts with fewer words (0 = keep every post)')
+    parser.add_argument('--std-cutoff', type=float,
+                        help='also drop posts more than this many standard deviations below the mean word count')
+    parser.add_argument('--drop-duplicates', action='store_true',
+                        help='also drop repeats of a post (same position, company and description)')
+    parser.add_argument('--near-duplicates', metavar='THRESHOLD', type=float, nargs='?', const=DEDUP_THRESHOLD,
+                        help='add cluster_id and is_canonical columns grouping posts whose descriptions are at '
+                             f'least this similar (default {DEDUP_THRESHOLD}; see dedup.py)')
+    parser.add_argument('--compact', action='store_true',
+                        help='write small integer, categorical and bitmask columns (see compact.py)')
+    parser.add_argument('--drop-description', action='store_true', help='with --compact, leave out the description')
+    parser.add_argument('--index', metavar='DIR',
+                        help='also write an inverted index of the output here, for index.py queries')
+    parser.add_argument('--rollup', metavar='PATH',
+                        help='also write the rollup of market statistics here, for rollup.py queries')
+    parser.add_argument('--memo-size', type=int, default=memo_cache.maxsize,
+                        help='entries kept in the LRU of per-value extractor results')
+    parser.add_argument('--memo-mb', type=float, default=memo_cache.maxbytes / 2**20,
+                        help='approximate megabytes of results kept in that LRU')
+    parser.add_argument('--memo-file', help='persist the LRU of extractor results here between runs')
+    parser.add_argument('--report', help='write per-step timings, memory and row counts here (.ndjson or .json)')
+    parser.add_argument('--trace-memory', action='store_true',
+                        help='add the peak Python allocations of each step to the report (slower)')
+    parser.add_argument('--profile', metavar='STEP', help='run cProfile around this step (e.g. experience)')
+    parser.add_argument('--profile-output', help='file for the cProfile stats (default: STEP.prof)')
+    args = parser.parse_args()
+
+    pd.options.display.max_rows = 4000
+
+    memo_cache.maxsize = args.memo_size
+    memo_cache.maxbytes = int(args.memo_mb * 2**20)
+    memo_tag = processing_fingerprint() if args.memo_file else None
+    if args.memo_file:
+        memo_cache.load(args.memo_file, memo_tag)
+    if args.report or args.trace_memory or args.profile:
+        instrumentation.enable(args.report, args.trace_memory, args.profile, args.profile_output)
+    try:
+        run(args)
+    finally:
+        memo_cache.print_report()
+        if args.memo_file:
+            memo_cache.save(args.memo_file, memo_tag)
+        if instrumentation.enabled:
+            instrumentation.print_summary()
+            instrumentation.close()
+            if args.report:
+                print(f"Step report saved to '{args.report}'")
+            if args.profile:
+                print(f"Profile of '{args.profile}' saved to '{instrumentation.profile_path}'")
+
+if __name__ == "__main__":
+    main()